@@ -5,7 +5,7 @@ a = Analysis(
     ['chess_game.py'],
     pathex=[],
     binaries=[],
-    datas=[('board.py', '.'), ('ai.py', '.')],
+    datas=[('board.py', '.'), ('bitboard.py', '.'), ('ai.py', '.'), ('transposition.py', '.'), ('book.py', '.'), ('book.bin', '.'), ('tablebase.py', '.'), ('ponder.py', '.'), ('stats.py', '.'), ('batch_eval.py', '.'), ('analysis_cache.py', '.'), ('game_state.py', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
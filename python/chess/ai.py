@@ -1,49 +1,673 @@
-def evaluate_board(board):
-    piece_values = {
-        'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000,
-        'p': -100, 'n': -320, 'b': -330, 'r': -500, 'q': -900, 'k': -20000
-    }
-    
-    score = 0
-    for i in range(8):
-        for j in range(8):
-            piece = board.board[i][j]
-            if piece != '.':
-                score += piece_values[piece]
-                
-                # Бонус за позицию (центр доски ценнее)
-                if piece.upper() in ['P', 'N', 'B']:
-                    center_distance = abs(3.5 - i) + abs(3.5 - j)
-                    score += (4 - center_distance) * (1 if piece.isupper() else -1)
-    
+import os
+import time
+
+from board import CAPTURE_FLAG, NO_MOVE, MAX_MOVES, decode_move, new_move_buffer
+from transposition import EXACT, LOWER, UPPER
+from tablebase import WIN, LOSS
+from stats import SearchStats
+from batch_eval import evaluate_children
+
+# Оценка мата; мат в N полуходов оценивается как MATE_SCORE - N,
+# чтобы поиск предпочитал самый короткий мат
+MATE_SCORE = 1000000
+MATE_BOUND = MATE_SCORE - 1000
+
+# Режим отладки: каждая оценка сверяется с полным пересчетом
+DEBUG_EVAL = os.environ.get('CHESS_DEBUG_EVAL') == '1'
+
+MAX_DEPTH = 64
+MAX_PLY = 128
+# Как часто (в узлах) проверять, не истекло ли время
+CHECK_INTERVAL = 1024
+
+
+# Стоимость фигур для упорядочивания взятий (MVV-LVA)
+ORDER_VALUES = {'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 10}
+ORDER_VALUES.update({piece.lower(): value for piece, value in ORDER_VALUES.items()})
+
+# Стоимость фигур для статической оценки разменов (SEE)
+SEE_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000}
+SEE_VALUES.update({piece.lower(): value for piece, value in SEE_VALUES.items()})
+# Запас для дельта-отсечения: взятие, которое даже с этим запасом
+# не поднимает оценку до alpha, в форсированном поиске не рассматривается
+DELTA_MARGIN = 200
+
+# Нулевой ход: сторона пропускает ход, и если даже тогда поиск
+# с уменьшенной на NULL_MOVE_REDUCTION глубиной дает отсечение, узел отсекается
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+# Сокращение поздних ходов: тихие ходы после первых LMR_MIN_MOVES по порядку
+# (с LMR_MIN_MOVES + 1-го) сначала ищутся на полуход мельче и перепроверяются
+# при улучшении alpha
+LMR_MIN_MOVES = 3
+LMR_MIN_DEPTH = 3
+
+# Окно стремления: начиная с ASPIRATION_MIN_DEPTH корень ищется с окном
+# +-ASPIRATION_WINDOW вокруг оценки прошлой итерации; при выходе за окно оно
+# расширяется в ASPIRATION_GROWTH раз, а после ASPIRATION_MAX становится бесконечным
+ASPIRATION_MIN_DEPTH = 4
+ASPIRATION_WINDOW = 50
+ASPIRATION_GROWTH = 4
+ASPIRATION_MAX = 1000
+
+# В постоянный кэш анализа (analysis_cache) попадают и из него читаются
+# только узлы не мельче этой глубины: мелкие узлы быстро пересчитываются
+# и лишь вытесняли бы ценные записи
+CACHE_MIN_DEPTH = 3
+
+# Стадии ленивой генерации ходов (AI.staged_moves)
+STAGE_HASH = 0
+STAGE_CAPTURES = 1
+STAGE_KILLERS = 2
+STAGE_QUIETS = 3
+STAGE_NAMES = ('hash', 'captures', 'killers', 'quiets')
+
+# Приоритеты групп ходов при упорядочивании
+HASH_MOVE_PRIORITY = 1 << 30
+CAPTURE_PRIORITY = 1 << 28
+KILLER_PRIORITY = (1 << 27, (1 << 27) - 1)
+
+
+def score_to_tt(score, ply):
+    # В таблице матовые оценки хранятся относительно узла, а не корня
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
     return score
 
-def negamax(board, depth, alpha, beta, is_white):
-    if depth == 0:
-        return evaluate_board(board) * (1 if is_white else -1), None
-        
-    best_move = None
-    best_value = float('-inf')
-    
-    moves = board.get_legal_moves(is_white)
-    if not moves:
-        if board.is_in_check(is_white):
-            return float('-inf'), None
-        return 0, None
-        
-    for move in moves:
-        new_board = board.copy()
-        new_board.make_move(move)
-        
-        value, _ = negamax(new_board, depth - 1, -beta, -alpha, not is_white)
-        value = -value
+
+def score_from_tt(score, ply):
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def see(board, move):
+    # Статическая оценка размена (SEE) для хода-кода: итог серии взятий на
+    # клетке хода, если каждая сторона бьет самой дешевой фигурой и может остановиться
+    from_pos, to_pos = decode_move(move)
+    victim = board.board[to_pos[0]][to_pos[1]]
+    piece = board.board[from_pos[0]][from_pos[1]]
+    board.make_move_code(move)
+    value = SEE_VALUES[victim] - _see_recapture(board, to_pos, piece, not piece.isupper())
+    board.unmake_move()
+    return value
+
+
+def _see_recapture(board, square, target, by_white):
+    attacker = board.least_valuable_attacker(square, by_white)
+    if attacker is None:
+        return 0
+    piece = board.board[attacker[0]][attacker[1]]
+    board.make_move((attacker, square))
+    value = max(0, SEE_VALUES[target] - _see_recapture(board, square, piece, not by_white))
+    board.unmake_move()
+    return value
+
+
+def tablebase_score(result, ply):
+    # Результат таблиц окончаний (WIN/DRAW/LOSS, полуходов до мата)
+    # в шкале оценок поиска с учетом расстояния от корня
+    outcome, plies = result
+    if outcome == WIN:
+        return MATE_SCORE - (ply + plies)
+    if outcome == LOSS:
+        return -(MATE_SCORE - (ply + plies))
+    return 0
+
+
+def evaluate_board(board):
+    # Материал и позиционные таблицы поддерживаются доской инкрементально
+    # (Board.make_move / unmake_move), поэтому оценка листа - O(1)
+    if DEBUG_EVAL:
+        assert board.score == board.compute_score(), "инкрементальная оценка разошлась с полным пересчетом"
+    return board.score
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class AI:
+    def __init__(self, tt=None, ordering=True, quiescence=True, book=None, tablebase=None,
+                 null_move=True, lmr=True, pvs=True, aspiration=True, batch_leaves=True,
+                 cache=None, states=None):
+        self.tt = tt
+        # Постоянный кэш анализа (AnalysisCache) - второй уровень хеш-таблицы,
+        # общий для запусков программы и процессов
+        self.cache = cache
+        # Кэш состояний позиций (game_state.GameStates), общий с игровым циклом:
+        # легальные ходы и шах в корне поиска берутся из него. root_state -
+        # состояние корня текущего поиска
+        self.states = states
+        self.root_state = None
+        self.book = book
+        self.tablebase = tablebase
+        # Откуда взят последний ход: 'book', 'tablebase' или 'search'
+        self.move_source = None
+        # Запрос на остановку поиска из другого потока (размышление
+        # на времени соперника); сбрасывает его тот, кто выставил
+        self.stop_requested = False
+        self.ordering = ordering
+        self.quiescence = quiescence
+        self.null_move = null_move
+        self.lmr = lmr
+        self.pvs = pvs
+        self.aspiration = aspiration
+        # Без форсированного поиска дети узлов глубины 1 - листья, и они
+        # оцениваются пакетом (batch_eval.evaluate_children)
+        self.batch_leaves = batch_leaves
+        # Основной вариант последней завершенной итерации: ожидаемая
+        # последовательность ходов, начиная с лучшего хода
+        self.pv = []
+        # Треугольная таблица вариантов: pv_table[ply] - лучшая линия (коды
+        # ходов) из узла на полуходе ply
+        self.pv_table = [[] for _ in range(MAX_PLY + 1)]
+        # Буферы для генерации ходов, по одному на полуход: в поиске ходы -
+        # 16-битные коды, и на каждый узел не создается новых списков ходов
+        self.move_buffers = [new_move_buffer() for _ in range(MAX_PLY + 1)]
+        # Узлы основного поиска и узлы форсированного поиска (взятий) отдельно
+        self.nodes = 0
+        self.qnodes = 0
+        # Отсечения по beta: всего, первым же ходом и нулевым ходом
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_move_cutoffs = 0
+        # Ленивая генерация: в скольких узлах дошли до каждой стадии, сколько
+        # ходов каждой стадии проверено и сколько из них дали отсечение.
+        # move_stages[ply] - стадия хода, который сейчас проверяется на полуходе ply
+        self.staged_nodes = 0
+        self.stage_entered = [0] * len(STAGE_NAMES)
+        self.stage_moves = [0] * len(STAGE_NAMES)
+        self.stage_cutoffs = [0] * len(STAGE_NAMES)
+        self.move_stages = [STAGE_HASH] * (MAX_PLY + 1)
+        # Статистика последнего вызова get_best_move
+        self.stats = SearchStats()
+        self.search_start = 0.0
+        self.deadline = None
+        self.node_limit = None
+        self.limits_enabled = False
+        # Число узлов каждой завершенной итерации
+        self.iteration_nodes = []
+        # Ходы-убийцы (по два на полуход) и таблица истории [фигура][клетка],
+        # сохраняются между итерациями углубления
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY)]
+        self.history = {piece: [0] * 64 for piece in 'PNBRQKpnbrqk'}
+
+    def new_search(self):
+        # Убийцы относятся к конкретным полуходам прошлого поиска и устаревают,
+        # а историю только ослабляем, чтобы она постепенно забывалась
+        for killers in self.killers:
+            killers[0] = killers[1] = NO_MOVE
+        for scores in self.history.values():
+            for sq in range(64):
+                scores[sq] >>= 1
+
+    def branching_factor(self):
+        # Эффективный коэффициент ветвления: во сколько раз выросло число
+        # узлов при переходе от предпоследней итерации к последней
+        if len(self.iteration_nodes) < 2 or not self.iteration_nodes[-2]:
+            return 0.0
+        return self.iteration_nodes[-1] / self.iteration_nodes[-2]
+
+    def order_moves(self, board, buffer, count, hash_move, ply):
+        # Порядок: ход из хеш-таблицы, взятия по MVV-LVA (ценная жертва,
+        # дешевый нападающий), ходы-убийцы, остальные по таблице истории.
+        # Ключ сортировки - одно целое: приоритет и номер хода в буфере
+        # (при равном приоритете сохраняется порядок генерации)
+        killer1, killer2 = self.killers[ply] if ply < MAX_PLY else (NO_MOVE, NO_MOVE)
+        history = self.history
+        squares = board.board
+        keys = []
+        for index in range(count):
+            move = buffer[index]
+            from_sq = move >> 6 & 63
+            to_sq = move & 63
+            piece = squares[from_sq >> 3][from_sq & 7]
+            if move == hash_move:
+                priority = HASH_MOVE_PRIORITY
+            elif move & CAPTURE_FLAG:
+                victim = squares[to_sq >> 3][to_sq & 7]
+                priority = CAPTURE_PRIORITY + ORDER_VALUES[victim] * 16 - ORDER_VALUES[piece]
+            elif move == killer1:
+                priority = KILLER_PRIORITY[0]
+            elif move == killer2:
+                priority = KILLER_PRIORITY[1]
+            else:
+                priority = history[piece][to_sq]
+            keys.append(priority << 8 | (MAX_MOVES - 1 - index))
+        keys.sort(reverse=True)
+        return [buffer[MAX_MOVES - 1 - (key & 0xFF)] for key in keys]
+
+    def staged_moves(self, board, buffer, is_white, hash_move, ply):
+        # Ходы по стадиям: ход из хеш-таблицы, взятия по MVV-LVA, ходы-убийцы,
+        # тихие ходы по истории. Генератор ленивый: если ход ранней стадии
+        # дал отсечение, следующие стадии не генерируются вовсе
+        entered = self.stage_entered
+        searched = self.stage_moves
+        stages = self.move_stages
+        self.staged_nodes += 1
+        tried = []
+        if hash_move != NO_MOVE:
+            entered[STAGE_HASH] += 1
+            if board.is_move_code_legal(hash_move, is_white):
+                tried.append(hash_move)
+                stages[ply] = STAGE_HASH
+                searched[STAGE_HASH] += 1
+                yield hash_move
+
+        entered[STAGE_CAPTURES] += 1
+        count, _ = board.generate_moves(buffer, is_white, captures_only=True)
+        for move in self.order_moves(board, buffer, count, NO_MOVE, ply):
+            if move not in tried:
+                stages[ply] = STAGE_CAPTURES
+                searched[STAGE_CAPTURES] += 1
+                yield move
+
+        # Убийцы - тихие ходы из соседних узлов того же полухода,
+        # в этой позиции их легальность нужно проверить
+        entered[STAGE_KILLERS] += 1
+        for killer in (self.killers[ply] if ply < MAX_PLY else ()):
+            if killer not in tried and board.is_move_code_legal(killer, is_white):
+                tried.append(killer)
+                stages[ply] = STAGE_KILLERS
+                searched[STAGE_KILLERS] += 1
+                yield killer
+
+        entered[STAGE_QUIETS] += 1
+        count, _ = board.generate_moves(buffer, is_white, quiets_only=True)
+        for move in self.order_moves(board, buffer, count, NO_MOVE, ply):
+            if move not in tried:
+                stages[ply] = STAGE_QUIETS
+                searched[STAGE_QUIETS] += 1
+                yield move
+
+    def _update_quiet_cutoff(self, board, move, depth, ply):
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if move != killers[0]:
+                killers[1] = killers[0]
+                killers[0] = move
+        from_sq = move >> 6 & 63
+        self.history[board.board[from_sq >> 3][from_sq & 7]][move & 63] += depth * depth
+
+    def get_best_move(self, board, is_white, max_depth=MAX_DEPTH, time_limit=None, node_limit=None):
+        # Итеративное углубление: глубина 1, 2, 3, ... пока не кончится
+        # время (секунды) или лимит узлов. Возвращается результат последней
+        # полностью завершенной итерации: (оценка, ход, глубина).
+        # Ход из дебютной книги или таблиц окончаний возвращается без поиска,
+        # с глубиной 0. Основной вариант остается в self.pv, статистика - в self.stats
+        self.search_start = time.perf_counter()
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_move_cutoffs = 0
+        self.staged_nodes = 0
+        self.stage_entered = [0] * len(STAGE_NAMES)
+        self.stage_moves = [0] * len(STAGE_NAMES)
+        self.stage_cutoffs = [0] * len(STAGE_NAMES)
+        self.stats = stats = SearchStats(board.to_fen(is_white))
+        if self.tt is not None:
+            tt_probes, tt_hits = self.tt.probes, self.tt.hits
+        if self.cache is not None:
+            cache_probes, cache_hits = self.cache.probes, self.cache.hits
+
+        if self.states is not None:
+            self.root_state = self.states.get(board, is_white)
+        best = self._choose_move(board, is_white, max_depth, time_limit, node_limit)
+        self.root_state = None
+
+        stats.source = self.move_source
+        stats.score, stats.move, stats.depth = best
+        stats.elapsed = time.perf_counter() - self.search_start
+        stats.nodes = self.nodes
+        stats.qnodes = self.qnodes
+        stats.cutoffs = self.cutoffs
+        stats.first_move_cutoffs = self.first_move_cutoffs
+        stats.null_move_cutoffs = self.null_move_cutoffs
+        stats.staged_nodes = self.staged_nodes
+        stats.stages = {name: {'entered': self.stage_entered[stage],
+                               'moves': self.stage_moves[stage],
+                               'cutoffs': self.stage_cutoffs[stage]}
+                        for stage, name in enumerate(STAGE_NAMES)}
+        if self.tt is not None:
+            stats.tt_probes = self.tt.probes - tt_probes
+            stats.tt_hits = self.tt.hits - tt_hits
+        if self.cache is not None:
+            stats.cache_probes = self.cache.probes - cache_probes
+            stats.cache_hits = self.cache.hits - cache_hits
+        stats.pv = list(self.pv)
+        return best
+
+    def _choose_move(self, board, is_white, max_depth, time_limit, node_limit):
+        legal = self.root_state.moves if self.root_state is not None else None
+        if self.book is not None:
+            move = self.book.choose_move(board, is_white, legal=legal)
+            if move is not None:
+                self.move_source = 'book'
+                self.pv = [move]
+                return 0, move, 0
+        if self.tablebase and board.piece_count <= 3:
+            best = self.tablebase_move(board, is_white, legal)
+            if best is not None:
+                self.move_source = 'tablebase'
+                self.pv = [best[1]]
+                return best
+
+        self.move_source = 'search'
+        self.deadline = time.time() + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.iteration_nodes = []
+        self.pv = []
+        self.new_search()
+        if self.tt is not None:
+            self.tt.new_search()
+
+        stack_size = len(board.undo_stack)
+        best = (0, None, 0)
+        for depth in range(1, max_depth + 1):
+            # Первую итерацию всегда доводим до конца, чтобы был хотя бы один ход
+            self.limits_enabled = depth > 1
+            nodes_before = self.nodes + self.qnodes
+            try:
+                score, move = self.aspiration_search(board, depth, best[0], is_white)
+            except SearchTimeout:
+                # Поиск прерван посреди дерева - возвращаем доску в исходное состояние
+                while len(board.undo_stack) > stack_size:
+                    board.unmake_move()
+                break
+            best = (score, decode_move(move), depth)
+            self.pv = self.collect_pv(board, is_white, depth)
+            self.iteration_nodes.append(self.nodes + self.qnodes - nodes_before)
+            self.stats.add_iteration(depth, score, self.iteration_nodes[-1],
+                                     time.perf_counter() - self.search_start, self.pv)
+            if move == NO_MOVE or abs(score) > MATE_BOUND:
+                break
+        return best
+
+    def aspiration_search(self, board, depth, guess, is_white):
+        # Поиск в корне с окном вокруг оценки прошлой итерации guess
+        if not self.aspiration or depth < ASPIRATION_MIN_DEPTH or abs(guess) > MATE_BOUND:
+            return self.negamax(board, depth, float('-inf'), float('inf'), is_white)
+        delta = ASPIRATION_WINDOW
+        alpha, beta = guess - delta, guess + delta
+        while True:
+            score, move = self.negamax(board, depth, alpha, beta, is_white)
+            if alpha < score < beta:
+                return score, move
+            delta *= ASPIRATION_GROWTH
+            if score <= alpha:
+                alpha = score - delta if delta < ASPIRATION_MAX else float('-inf')
+            else:
+                beta = score + delta if delta < ASPIRATION_MAX else float('inf')
+
+    def collect_pv(self, board, is_white, depth):
+        # Основной вариант из треугольной таблицы. Если он оборвался на
+        # отсечении по хеш-таблице, продолжаем его ходами из таблицы
+        pv = list(self.pv_table[0])
+        side = is_white
+        for move in pv:
+            board.make_move_code(move)
+            side = not side
+        buffer = self.move_buffers[0]
+        while self.tt is not None and len(pv) < depth:
+            entry = self.tt.probe(board.position_key(side))
+            if entry is None:
+                break
+            count, _ = board.generate_moves(buffer, side)
+            if entry[3] not in buffer[:count]:
+                break
+            pv.append(entry[3])
+            board.make_move_code(entry[3])
+            side = not side
+        for _ in pv:
+            board.unmake_move()
+        return [decode_move(move) for move in pv]
+
+    def tablebase_move(self, board, is_white, legal=None):
+        # Лучший ход по таблицам: самый быстрый мат при выигрыше,
+        # самое долгое сопротивление при проигрыше
+        best = None
+        for move in (board.get_legal_moves(is_white) if legal is None else legal):
+            board.make_move(move)
+            result = self.tablebase.probe(board, not is_white)
+            board.unmake_move()
+            if result is None:
+                return None
+            score = -tablebase_score(result, 1)
+            if best is None or score > best[0]:
+                best = (score, move, 0)
+        return best
+
+    def _check_limits(self, count):
+        if self.node_limit is not None and self.nodes + self.qnodes >= self.node_limit:
+            raise SearchTimeout
+        if count % CHECK_INTERVAL == 0 and (self.stop_requested or (
+                self.deadline is not None and time.time() >= self.deadline)):
+            raise SearchTimeout
+
+    def quiesce(self, board, alpha, beta, is_white, ply):
+        # Форсированный поиск: только взятия (под шахом - все ходы),
+        # чтобы не оценивать позицию посреди размена
+        self.qnodes += 1
+        if self.limits_enabled:
+            self._check_limits(self.qnodes)
+
+        if ply >= MAX_PLY:
+            return evaluate_board(board) * (1 if is_white else -1)
+
+        buffer = self.move_buffers[ply]
+        count, in_check = board.generate_moves(buffer, is_white, captures_only=True)
+        if in_check:
+            count, _ = board.generate_moves(buffer, is_white)
+            if not count:
+                return -(MATE_SCORE - ply)
+            stand_pat = float('-inf')
+        else:
+            # Стоящая оценка: сторона может не продолжать размен
+            stand_pat = evaluate_board(board) * (1 if is_white else -1)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+
+        best_value = stand_pat
+        squares = board.board
+        for move in self.order_moves(board, buffer, count, NO_MOVE, ply):
+            if not in_check:
+                from_sq = move >> 6 & 63
+                to_sq = move & 63
+                victim = SEE_VALUES[squares[to_sq >> 3][to_sq & 7]]
+                # Дельта-отсечение: даже выигрыш фигуры не дотягивает до alpha.
+                # Оценка fail-soft, поэтому пропущенное взятие поднимает ее до
+                # оптимистичной границы - иначе она не будет верхней оценкой
+                optimistic = stand_pat + victim + DELTA_MARGIN
+                if optimistic < alpha:
+                    if optimistic > best_value:
+                        best_value = optimistic
+                    continue
+                # Взятия, проигрывающие материал по SEE, пропускаем
+                if SEE_VALUES[squares[from_sq >> 3][from_sq & 7]] > victim and see(board, move) < 0:
+                    continue
+            board.make_move_code(move)
+            value = -self.quiesce(board, -beta, -alpha, not is_white, ply + 1)
+            board.unmake_move()
+            if value > best_value:
+                best_value = value
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    break
+        return best_value
+
+    def negamax(self, board, depth, alpha, beta, is_white, ply=0, allow_null=True):
+        self.pv_table[ply] = []
+        if depth == 0:
+            if self.quiescence:
+                return self.quiesce(board, alpha, beta, is_white, ply), NO_MOVE
+            self.nodes += 1
+            return evaluate_board(board) * (1 if is_white else -1), NO_MOVE
+
+        self.nodes += 1
+        if self.limits_enabled:
+            self._check_limits(self.nodes)
+
+        if self.tablebase and ply > 0 and board.piece_count <= 3:
+            result = self.tablebase.probe(board, is_white)
+            if result is not None:
+                return tablebase_score(result, ply), NO_MOVE
+            
+        tt = self.tt
+        cache = self.cache if depth >= CACHE_MIN_DEPTH else None
+        alpha_orig = alpha
+        hash_move = NO_MOVE
+        if tt is not None or cache is not None:
+            key = board.position_key(is_white)
+            entry = tt.probe(key) if tt is not None else None
+            if cache is not None and (entry is None or entry[0] < depth):
+                # В хеш-таблице нет достаточно глубокой оценки - возможно,
+                # позиция уже была просчитана в прошлых партиях
+                cached = cache.probe(key)
+                if cached is not None and (entry is None or cached[0] > entry[0]):
+                    entry = cached
+            if entry is not None:
+                tt_depth, tt_score, tt_flag, hash_move = entry
+                if tt_depth >= depth and ply > 0:
+                    tt_score = score_from_tt(tt_score, ply)
+                    if (tt_flag == EXACT or
+                            (tt_flag == LOWER and tt_score >= beta) or
+                            (tt_flag == UPPER and tt_score <= alpha)):
+                        return tt_score, hash_move
+            
+        best_move = NO_MOVE
+        best_value = float('-inf')
         
-        if value > best_value:
-            best_value = value
-            best_move = move
+        # Ходы генерируются ниже, по стадиям; есть ли они вообще, становится
+        # известно только после перебора
+        buffer = self.move_buffers[ply]
+        root_state = self.root_state if ply == 0 else None
+        if root_state is not None:
+            # Корень: легальные ходы и шах уже известны из GameState
+            count = len(root_state.codes)
+            buffer[:count] = root_state.codes
+            in_check = root_state.in_check
+        else:
+            in_check = board.is_in_check(is_white)
+
+        # Нулевой ход. Не делается под шахом, два раза подряд, у границы
+        # мата и в окончаниях без фигур, где пропуск хода мог бы спасти
+        # от цугцванга
+        if (self.null_move and allow_null and ply > 0 and not in_check and
+                depth >= NULL_MOVE_MIN_DEPTH and beta < MATE_BOUND and
+                evaluate_board(board) * (1 if is_white else -1) >= beta and
+                board.has_non_pawn_material(is_white)):
+            value, _ = self.negamax(board, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1,
+                                    not is_white, ply + 1, allow_null=False)
+            if -value >= beta:
+                self.null_move_cutoffs += 1
+                # Мат, найденный после пропуска хода, не доказан
+                return (beta if -value >= MATE_BOUND else -value), NO_MOVE
             
-        alpha = max(alpha, value)
-        if alpha >= beta:
-            break
+        if depth == 1 and not self.quiescence and self.batch_leaves:
+            # Все дети - листья со статической оценкой: они оцениваются одним
+            # пакетом без выполнения ходов, и вместо перебора по порядку сразу
+            # берется лучший (при отсечении оценка fail-soft, не меньше beta)
+            if root_state is None:
+                count, _ = board.generate_moves(buffer, is_white)
+            if not count:
+                return (-(MATE_SCORE - ply) if in_check else 0), NO_MOVE
+            values = evaluate_children(board, buffer[:count])
+            if not is_white:
+                values = [-value for value in values]
+            best_value = max(values)
+            best_move = buffer[values.index(best_value)]
+            self.nodes += count
+            if best_value > alpha:
+                self.pv_table[ply] = [best_move]
+            if best_value >= beta:
+                # Лучший ход проверен первым, поэтому отсечение - первым ходом
+                self.cutoffs += 1
+                self.first_move_cutoffs += 1
+                if self.ordering and not best_move & CAPTURE_FLAG:
+                    self._update_quiet_cutoff(board, best_move, depth, ply)
+            moves = ()
+        elif self.ordering and root_state is not None:
+            moves = self.order_moves(board, buffer, count, hash_move, ply)
+        elif self.ordering:
+            moves = self.staged_moves(board, buffer, is_white, hash_move, ply)
+        else:
+            if root_state is None:
+                count, _ = board.generate_moves(buffer, is_white)
+            moves = buffer[:count]
+            if hash_move != NO_MOVE and hash_move in moves:
+                moves.remove(hash_move)
+                moves.insert(0, hash_move)
+
+        reduce_late = self.lmr and self.ordering and depth >= LMR_MIN_DEPTH and not in_check
+        for index, move in enumerate(moves):
+            quiet = not move & CAPTURE_FLAG
+            board.make_move_code(move)
+            full_window = True
+            if (reduce_late and quiet and index >= LMR_MIN_MOVES and
+                    not board.is_in_check(not is_white)):
+                # Поздний тихий ход без шаха: сначала мелкий поиск с нулевым
+                # окном, полный - только если ход оказался лучше alpha
+                value, _ = self.negamax(board, depth - 2, -alpha - 1, -alpha, not is_white, ply + 1)
+                full_window = -value > alpha
+            if full_window and self.pvs and index > 0:
+                # PVS: ходы после первого только проверяются на то, что они
+                # не лучше alpha (нулевое окно); при ошибке - поиск с полным окном
+                value, _ = self.negamax(board, depth - 1, -alpha - 1, -alpha, not is_white, ply + 1)
+                full_window = alpha < -value < beta
+            if full_window:
+                value, _ = self.negamax(board, depth - 1, -beta, -alpha, not is_white, ply + 1)
+            board.unmake_move()
+            value = -value
             
-    return best_value, best_move 
\ No newline at end of file
+            if value > best_value:
+                best_value = value
+                best_move = move
+                
+            if value > alpha:
+                alpha = value
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+            if alpha >= beta:
+                self.cutoffs += 1
+                if index == 0:
+                    self.first_move_cutoffs += 1
+                # Ходы корня из GameState упорядочены без стадий
+                # и в статистику стадий не входят
+                if self.ordering and root_state is None:
+                    self.stage_cutoffs[self.move_stages[ply]] += 1
+                # Тихий ход, вызвавший отсечение, запоминаем как убийцу
+                if self.ordering and quiet:
+                    self._update_quiet_cutoff(board, move, depth, ply)
+                break
+
+        if best_value == float('-inf'):
+            # Ни одного легального хода: мат или пат
+            return (-(MATE_SCORE - ply) if in_check else 0), NO_MOVE
+                
+        if tt is not None or cache is not None:
+            if best_value <= alpha_orig:
+                flag = UPPER
+            elif best_value >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            score = score_to_tt(best_value, ply)
+            if tt is not None:
+                tt.store(key, depth, score, flag, best_move)
+            if cache is not None:
+                cache.store(key, depth, score, flag, best_move)
+                
+        return best_value, best_move
+
+
+def negamax(board, depth, alpha, beta, is_white, tt=None):
+    # Поиск на фиксированную глубину без ограничения по времени
+    value, move = AI(tt).negamax(board, depth, alpha, beta, is_white)
+    return value, decode_move(move)
@@ -0,0 +1,180 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+# Постоянный кэш анализа: результаты поиска в узлах достаточной глубины,
+# которые переживают перезапуск программы. Файл: заголовок (сигнатура,
+# число записей, номер сессии) и записи фиксированной длины по 16 байт,
+# сгруппированные в корзины по BUCKET_SIZE. Файл отображается в память
+# (mmap) целиком, поэтому размер на диске и в памяти задается при создании.
+#
+# Запись - два 64-битных числа: (ключ XOR данные, данные). Несколько
+# процессов пишут в файл без блокировок: если запись прочитана наполовину
+# обновленной, ключ не сойдется, и она считается отсутствующей
+MAGIC = b'CHESSAC1'
+HEADER = struct.Struct('<8sII')
+RECORD = struct.Struct('<QQ')
+BUCKET_SIZE = 4
+
+# При вытеснении запись прошлой сессии стоит столько же, сколько
+# запись на AGE_WEIGHT полуходов мельче
+AGE_WEIGHT = 2
+MAX_STORED_DEPTH = 63
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser('~'), '.python-chess-cache.bin')
+
+
+def _pack(depth, score, flag, move, age):
+    # Оценка (32 бита со смещением), ход (16), глубина (6), тип (2), сессия (8)
+    return ((score + (1 << 31)) | move << 32 | min(depth, MAX_STORED_DEPTH) << 48 |
+            flag << 54 | age << 56)
+
+
+def _create(path, slots):
+    # Новый файл собирается под временным именем и переименовывается
+    # целиком: другие процессы не увидят недописанный кэш, а прерванное
+    # создание оставит только временный файл
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, slots, 0))
+            f.truncate(HEADER.size + slots * RECORD.size)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _unpack(data):
+    # -> (глубина, оценка, тип, ход)
+    return (data >> 48 & 63, (data & 0xFFFFFFFF) - (1 << 31),
+            data >> 54 & 3, data >> 32 & 0xFFFF)
+
+
+class AnalysisCache:
+    # Интерфейс probe/store совпадает с TranspositionTable. Каждое открытие
+    # кэша - новая сессия (кроме new_session=False): записи прошлых сессий
+    # вытесняются раньше
+    def __init__(self, path=DEFAULT_CACHE, size_mb=16, new_session=True):
+        self.path = path
+        buckets = max(1, size_mb * 1024 * 1024 // (RECORD.size * BUCKET_SIZE))
+        # Пустой файл кэшем не бывает (его оставляли прежние версии) - он
+        # заменяется новым
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            _create(path, buckets * BUCKET_SIZE)
+        self.file = open(path, 'r+b')
+        self.data = mmap.mmap(self.file.fileno(), 0)
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError(f"Файл не является кэшем анализа: {path}")
+        magic, self.slots, age = HEADER.unpack_from(self.data, 0)
+        if (magic != MAGIC or not self.slots or self.slots % BUCKET_SIZE or
+                len(self.data) != HEADER.size + self.slots * RECORD.size):
+            self.close()
+            raise ValueError(f"Файл не является кэшем анализа: {path}")
+        self.buckets = self.slots // BUCKET_SIZE
+        self.age = age
+        if new_session:
+            self.age = (age + 1) & 0xFF
+            HEADER.pack_into(self.data, 0, MAGIC, self.slots, self.age)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def close(self):
+        if not self.data.closed:
+            self.data.flush()
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def probe(self, key):
+        # Возвращает (глубина, оценка, тип, код хода) или None
+        self.probes += 1
+        data = self.data
+        offset = HEADER.size + key % self.buckets * BUCKET_SIZE * RECORD.size
+        for _ in range(BUCKET_SIZE):
+            check, value = RECORD.unpack_from(data, offset)
+            if value and check ^ value == key:
+                self.hits += 1
+                return _unpack(value)
+            offset += RECORD.size
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        # Запись той же позиции заменяется, если новая не мельче или старая
+        # из прошлой сессии; иначе вытесняется наименее ценная запись корзины
+        data = self.data
+        offset = HEADER.size + key % self.buckets * BUCKET_SIZE * RECORD.size
+        target = None
+        worst = None
+        for _ in range(BUCKET_SIZE):
+            check, value = RECORD.unpack_from(data, offset)
+            if not value:
+                target = offset
+                break
+            stale = (self.age - (value >> 56)) & 0xFF
+            if check ^ value == key:
+                if stale == 0 and (value >> 48 & 63) > depth:
+                    return
+                target = offset
+                break
+            worth = (value >> 48 & 63) - AGE_WEIGHT * stale
+            if worst is None or worth < worst:
+                worst = worth
+                target = offset
+            offset += RECORD.size
+        value = _pack(depth, int(score), flag, move, self.age)
+        RECORD.pack_into(data, target, key ^ value, value)
+        self.stores += 1
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def usage(self):
+        # (занятых записей, из них текущей сессии)
+        used = current = 0
+        for offset in range(HEADER.size, len(self.data), RECORD.size):
+            check, value = RECORD.unpack_from(self.data, offset)
+            if value:
+                used += 1
+                if value >> 56 == self.age:
+                    current += 1
+        return used, current
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Постоянный кэш анализа")
+    parser.add_argument('command', choices=['info', 'clear'],
+                        help="info - заполненность, clear - удалить кэш")
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help="файл кэша")
+    args = parser.parse_args(argv)
+
+    if args.command == 'clear':
+        if os.path.exists(args.cache):
+            os.remove(args.cache)
+        print(f"Кэш удален: {args.cache}")
+        return 0
+
+    if not os.path.exists(args.cache):
+        print(f"Кэша нет: {args.cache}")
+        return 1
+    with AnalysisCache(args.cache, new_session=False) as cache:
+        used, current = cache.usage()
+        size_mb = len(cache.data) / (1024 * 1024)
+        print(f"Файл: {args.cache}, {size_mb:.1f} МБ")
+        print(f"Записей: {used} из {cache.slots} ({used / cache.slots:.1%}), "
+              f"из них последней сессии: {current}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+
+from ai import AI
+from analysis_cache import AnalysisCache
+from bitboard import BitBoard
+from board import format_move
+from tablebase import Tablebases
+from transposition import TranspositionTable
+
+# Сколько задач на процесс держать в очереди: файл читается по мере
+# обработки, поэтому расход памяти не зависит от его размера
+QUEUE_PER_WORKER = 4
+# Как часто (в секундах) печатать ход обработки
+PROGRESS_INTERVAL = 5.0
+
+# Хеш-таблица, таблицы окончаний и кэш анализа процесса-исполнителя
+# живут между задачами
+_worker_tt = None
+_worker_tablebase = None
+_worker_cache = None
+
+
+def _init_worker(tt_size_mb, cache_path):
+    global _worker_tt, _worker_tablebase, _worker_cache
+    _worker_tt = TranspositionTable(tt_size_mb)
+    _worker_tablebase = Tablebases()
+    if cache_path is not None:
+        # Сессию кэша открывает основной процесс, исполнители к ней подключаются
+        _worker_cache = AnalysisCache(cache_path, new_session=False)
+
+
+def parse_epd(line):
+    # 'расстановка очередь рокировки проход [операции;]' -> (FEN, id).
+    # Из операций берется только id; строки FEN со счетчиками ходов тоже подходят
+    fields = line.split(None, 4)
+    fen = ' '.join(fields[:4])
+    position_id = None
+    if len(fields) > 4:
+        for operation in fields[4].split(';'):
+            operation = operation.strip()
+            if operation.startswith('id '):
+                position_id = operation[3:].strip().strip('"')
+    return fen, position_id
+
+
+def analyse_position(task):
+    # Анализ одной позиции в процессе пула. Хеш-таблица очищается, а AI
+    # (убийцы, история) создается заново для каждой позиции, чтобы результат
+    # не зависел от распределения задач по процессам (если не задан общий
+    # кэш анализа: с ним процессы пользуются результатами друг друга)
+    line_number, line, depth, time_limit = task
+    fen, position_id = parse_epd(line)
+    record = {'line': line_number, 'fen': fen}
+    if position_id is not None:
+        record['id'] = position_id
+    try:
+        board, is_white = BitBoard.from_fen(fen)
+    except ValueError as error:
+        record['error'] = str(error)
+        return record
+
+    _worker_tt.clear()
+    ai = AI(_worker_tt, tablebase=_worker_tablebase, cache=_worker_cache)
+    start_time = time.perf_counter()
+    score, move, reached = ai.get_best_move(board, is_white, depth, time_limit)
+    elapsed = time.perf_counter() - start_time
+    nodes = ai.nodes + ai.qnodes
+    record.update({
+        'move': format_move(move) if move is not None else None,
+        'score': score,
+        'depth': reached,
+        'source': ai.move_source,
+        'nodes': nodes,
+        'time': round(elapsed, 4),
+        'nps': int(nodes / elapsed) if elapsed else 0,
+    })
+    return record
+
+
+def read_tasks(lines, depth, time_limit):
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line_number, line, depth, time_limit
+
+
+def run_analysis(lines, output, depth, time_limit=None, workers=None, tt_size_mb=16,
+                 log=sys.stderr, cache_path=None):
+    # Позиции раздаются пулу через окно ограниченного размера; результаты
+    # пишутся строками JSON в порядке входного файла по мере готовности
+    workers = workers or os.cpu_count() or 1
+    if cache_path is not None:
+        AnalysisCache(cache_path).close()
+    window = deque()
+    positions = 0
+    errors = 0
+    total_nodes = 0
+    start_time = last_report = time.perf_counter()
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start_time
+        rate = positions / elapsed if elapsed else 0
+        nps = total_nodes / elapsed if elapsed else 0
+        prefix = "Итого" if final else "Обработано"
+        print(f"{prefix}: {positions} позиций ({errors} с ошибками) за {elapsed:.1f} с, "
+              f"{rate:.2f} позиций/с, {nps:.0f} узлов/с", file=log)
+
+    with multiprocessing.Pool(workers, _init_worker, (tt_size_mb, cache_path)) as pool:
+        tasks = read_tasks(lines, depth, time_limit)
+        while True:
+            while len(window) < workers * QUEUE_PER_WORKER:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                window.append(pool.apply_async(analyse_position, (task,)))
+            if not window:
+                break
+            record = window.popleft().get()
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+            positions += 1
+            errors += 'error' in record
+            total_nodes += record.get('nodes', 0)
+            if time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.perf_counter()
+                report()
+    report(final=True)
+    return positions, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный анализ позиций из файла EPD/FEN")
+    parser.add_argument('input', help="файл EPD или FEN, по позиции на строку ('-' - стандартный ввод)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="файл результатов в формате JSON lines (по умолчанию стандартный вывод)")
+    parser.add_argument('--depth', type=int, default=5, help="глубина поиска (по умолчанию 5)")
+    parser.add_argument('--time', type=float, default=None,
+                        help="время на позицию в секундах (глубина тогда - верхняя граница)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="число процессов")
+    parser.add_argument('--hash', type=int, default=16, help="размер хеш-таблицы процесса в МБ")
+    parser.add_argument('--cache', default=None,
+                        help="файл постоянного кэша анализа, общего для всех процессов")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        _, errors = run_analysis(source, output, args.depth, args.time, args.workers, args.hash,
+                                 cache_path=args.cache)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import argparse
+import sys
+import time
+
+from board import CAPTURE_FLAG, PIECE_SCORES
+
+# NumPy не обязателен: без него evaluate_children считает оценки
+# в цикле Python, а evaluate_batch и piece_planes недоступны
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Порядок плоскостей фигур в тензоре позиций
+PLANE_PIECES = 'PNBRQKpnbrqk'
+PLANE_INDEX = {piece: index for index, piece in enumerate(PLANE_PIECES)}
+# Номер "плоскости" пустой клетки в таблице фигур по клеткам
+EMPTY = len(PLANE_PIECES)
+
+if numpy is not None:
+    # Веса (фигура, клетка): материал + позиция с точки зрения белых,
+    # те же числа, что и в инкрементальной оценке доски
+    WEIGHTS = numpy.array([PIECE_SCORES[piece] for piece in PLANE_PIECES], dtype=numpy.int64)
+
+
+def piece_planes(board):
+    # Позиция как 12 плоскостей 8x8 (по одной на фигуру), развернутых в 64 клетки
+    planes = numpy.zeros((len(PLANE_PIECES), 64), dtype=numpy.int8)
+    for i, row in enumerate(board.board):
+        for j, piece in enumerate(row):
+            if piece != '.':
+                planes[PLANE_INDEX[piece], i * 8 + j] = 1
+    return planes
+
+
+def stack_planes(boards):
+    # Тензор (позиции, 12, 64) для evaluate_batch
+    return numpy.stack([piece_planes(board) for board in boards])
+
+
+def evaluate_batch(planes):
+    # Материал и позиционная оценка (в пользу белых) для всех позиций
+    # тензора (N, 12, 64) за один проход
+    return numpy.einsum('npq,pq->n', planes, WEIGHTS)
+
+
+def evaluate_children(board, moves, use_numpy=False):
+    # Оценки позиций после каждого из ходов (кодов) moves без выполнения ходов.
+    # Используется поиском на листьях: все дети узла глубины 1 оцениваются
+    # одним вызовом. В узле обычно 20-50 детей, и на таких пакетах накладные
+    # расходы NumPy на вызов больше выигрыша, поэтому по умолчанию оценка
+    # считается приращениями к board.score в цикле Python
+    if use_numpy:
+        return _evaluate_children_numpy(board, moves)
+    squares = board.board
+    score = board.score
+    result = []
+    for move in moves:
+        from_sq = move >> 6 & 63
+        to_sq = move & 63
+        scores = PIECE_SCORES[squares[from_sq >> 3][from_sq & 7]]
+        value = score + scores[to_sq] - scores[from_sq]
+        if move & CAPTURE_FLAG:
+            value -= PIECE_SCORES[squares[to_sq >> 3][to_sq & 7]][to_sq]
+        result.append(value)
+    return result
+
+
+def _evaluate_children_numpy(board, moves):
+    # Плоскости детей - копии плоскостей узла, в которых фигура переставлена
+    # с исходной клетки на целевую, а взятая фигура снята
+    codes = numpy.array(moves, dtype=numpy.int64)
+    from_sq = codes >> 6 & 63
+    to_sq = codes & 63
+    parent = piece_planes(board)
+    square_piece = numpy.full(64, EMPTY, dtype=numpy.int64)
+    occupied = parent.nonzero()
+    square_piece[occupied[1]] = occupied[0]
+    moved = square_piece[from_sq]
+    captured = square_piece[to_sq]
+
+    planes = numpy.repeat(parent[numpy.newaxis], len(moves), axis=0)
+    rows = numpy.arange(len(moves))
+    taken = captured != EMPTY
+    planes[rows[taken], captured[taken], to_sq[taken]] = 0
+    planes[rows, moved, from_sq] = 0
+    planes[rows, moved, to_sq] = 1
+    return evaluate_batch(planes).tolist()
+
+
+def main(argv=None):
+    # Сверка пакетной оценки с инкрементальной и замер скорости
+    # на всех детях позиций из набора bench.py
+    from bench import BENCH_POSITIONS
+    from bitboard import BitBoard
+    from board import new_move_buffer
+
+    parser = argparse.ArgumentParser(description="Пакетная оценка позиций (NumPy)")
+    parser.add_argument('--repeat', type=int, default=200, help="повторов замера")
+    args = parser.parse_args(argv)
+    if numpy is None:
+        print("NumPy не установлен: используется оценка в цикле Python")
+
+    buffer = new_move_buffer()
+    samples = []
+    for placement, is_white in BENCH_POSITIONS:
+        board = BitBoard.from_placement(placement)
+        count, _ = board.generate_moves(buffer, is_white)
+        moves = list(buffer[:count])
+        expected = []
+        for move in moves:
+            board.make_move_code(move)
+            expected.append(board.compute_score())
+            board.unmake_move()
+        if evaluate_children(board, moves) != expected:
+            print(f"Оценки разошлись: {placement}")
+            return 1
+        if numpy is not None:
+            boards = []
+            for move in moves:
+                board.make_move_code(move)
+                boards.append(board.copy())
+                board.unmake_move()
+            if evaluate_batch(stack_planes(boards)).tolist() != expected:
+                print(f"Пакетная оценка разошлась: {placement}")
+                return 1
+
+        if numpy is not None and evaluate_children(board, moves, use_numpy=True) != expected:
+            print(f"Оценки NumPy разошлись: {placement}")
+            return 1
+        samples.append((board, moves))
+
+    print("Оценки совпадают")
+    leaves = sum(len(moves) for _, moves in samples) * args.repeat
+    for use_numpy in ([False, True] if numpy is not None else [False]):
+        start_time = time.perf_counter()
+        for _ in range(args.repeat):
+            for board, moves in samples:
+                evaluate_children(board, moves, use_numpy)
+        elapsed = time.perf_counter() - start_time
+        name = "NumPy" if use_numpy else "Python"
+        print(f"{name:6}: {leaves} листьев за {elapsed:.2f} с, {leaves / elapsed:.0f} листьев/с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import argparse
+import functools
+import json
+import sys
+import time
+import zlib
+
+from bitboard import BitBoard
+from board import format_move
+from ai import AI
+from transposition import TranspositionTable
+
+# Позиции для замера: (расстановка в нотации FEN, ход белых).
+# Дебюты, миттельшпили и эндшпили, чтобы нагрузка была похожа на реальную партию
+BENCH_POSITIONS = [
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR', True),
+    ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R', True),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8', True),
+    ('4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1', False),
+    ('rq3rk1/ppp2ppp/1bnpb3/3N2B1/3NP3/7P/PPPQ1PP1/2KR3R', True),
+    ('r1bq1r1k/1pp1n1pp/1p1p4/4p2Q/4Pp2/1BNP4/PPP2PPP/3R1RK1', True),
+    ('r3r1k1/2p2ppp/p1p1bn2/8/1q2P3/2NPQN2/PPP3PP/R4RK1', False),
+    ('r1bbk1nr/pp3p1p/2n5/1N4p1/2Np1B2/8/PPP2PPP/2KR1B1R', True),
+    ('r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1', True),
+    ('r2q1rk1/ppp2ppp/2np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1', True),
+    ('3r1rk1/p5pp/bpp1pp2/8/q1PP1P2/b3P3/P2NQRPP/1R2B1K1', False),
+    ('6k1/6p1/6Pp/ppp5/3pn2P/1P3K2/1PP2P2/3N4', False),
+    ('3b4/5kp1/1p1p1p1p/pP1PpP1P/P1P1P3/3KN3/8/8', True),
+    ('2K5/p7/7P/5pR1/8/5k2/r7/8', True),
+    ('8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4', True),
+    ('7k/3p2pp/4q3/8/4Q3/5Kp1/P6b/8', True),
+    ('8/2p5/8/2kPKp1p/2p4P/2P5/3P4/8', True),
+    ('8/1p3pp1/7p/5P1P/2k3P1/8/2K2P2/8', True),
+    ('8/pp2r1k1/2p1p3/3pP2p/1P1P1P1P/P5KR/8/8', True),
+    ('8/3p4/p1bk3p/Pp6/1Kp1PpPp/2P2P1P/2P5/5B2', False),
+    ('5k2/7R/4P2p/5K2/p1r2P1p/8/8/8', False),
+    ('6k1/6p1/P6p/r1N5/5p2/7P/1b3PP1/4R1K1', True),
+    ('1r3k2/4q3/2Pp3b/3Bp3/2Q2p2/1p1P2P1/1P2KP2/3N4', True),
+    ('6k1/4pp1p/3p2p1/P1pPb3/R7/1r2P1PP/3B1P2/6K1', True),
+    ('8/3p3B/5p2/5P2/p7/PP5b/k7/6K1', True),
+    ('8/8/8/8/5kp1/P7/8/1K1N4', True),
+    ('8/8/8/5N2/8/p7/8/2NK3k', True),
+    ('8/3k4/8/8/8/4B3/4KB2/2B5', True),
+    ('8/8/1P6/5pr1/8/4R3/7k/2K5', True),
+    ('8/2p4P/8/kr6/6R1/8/8/1K6', True),
+]
+
+
+def run_bench(depth=5, tt_size_mb=16, positions=BENCH_POSITIONS, ai_factory=AI):
+    # Поиск на фиксированную глубину по всем позициям. Для каждой позиции
+    # хеш-таблица и таблицы упорядочивания начинаются с нуля, поэтому
+    # результат детерминирован и зависит только от поведения поиска
+    tt = TranspositionTable(tt_size_mb)
+    results = []
+    total_nodes = 0
+    total_qnodes = 0
+    total_time = 0.0
+    for placement, is_white in positions:
+        tt.clear()
+        ai = ai_factory(tt)
+        board = BitBoard.from_placement(placement)
+        start_time = time.perf_counter()
+        score, move, _ = ai.get_best_move(board, is_white, max_depth=depth)
+        elapsed = time.perf_counter() - start_time
+        total_nodes += ai.nodes + ai.qnodes
+        total_qnodes += ai.qnodes
+        total_time += elapsed
+        results.append({
+            'position': placement,
+            'white_to_move': is_white,
+            'nodes': ai.nodes + ai.qnodes,
+            'qnodes': ai.qnodes,
+            'time': round(elapsed, 4),
+            'move': format_move(move) if move else None,
+            'score': score,
+        })
+
+    # Подпись: контрольная сумма узлов, ходов и оценок по всем позициям.
+    # Меняется при любом изменении поведения поиска, но не от скорости машины
+    digest = ';'.join(f"{r['nodes']}:{r['move']}:{r['score']}" for r in results)
+    return {
+        'depth': depth,
+        'positions': results,
+        'total_nodes': total_nodes,
+        'total_qnodes': total_qnodes,
+        'elapsed': round(total_time, 4),
+        'nps': round(total_nodes / total_time) if total_time else 0,
+        'signature': f"{zlib.crc32(digest.encode()):08x}",
+    }
+
+
+# Конфигурации выборочного поиска для сравнения: (название, нулевой ход, LMR)
+SELECTIVITY_CONFIGS = [
+    ("полный перебор", False, False),
+    ("нулевой ход", True, False),
+    ("LMR", False, True),
+    ("нулевой ход + LMR", True, True),
+]
+
+
+def compare_selectivity(depth=5, tt_size_mb=16, positions=BENCH_POSITIONS):
+    # Число узлов и время до заданной глубины с каждой техникой и без нее;
+    # совпадение ходов считается относительно поиска без сокращений
+    reports = []
+    for name, null_move, lmr in SELECTIVITY_CONFIGS:
+        factory = functools.partial(AI, null_move=null_move, lmr=lmr)
+        reports.append((name, run_bench(depth, tt_size_mb, positions, factory)))
+
+    base_nodes = reports[0][1]['total_nodes']
+    base_time = reports[0][1]['elapsed']
+    base_moves = [result['move'] for result in reports[0][1]['positions']]
+    print(f"Глубина {depth}, позиций: {len(positions)}")
+    print(f"{'Конфигурация':20} {'Узлов':>10} {'Доля':>6} {'Время, с':>9} {'Доля':>6} {'Те же ходы':>11}")
+    for name, report in reports:
+        same = sum(result['move'] == move for result, move in zip(report['positions'], base_moves))
+        print(f"{name:20} {report['total_nodes']:>10} {report['total_nodes'] / base_nodes:>6.0%} "
+              f"{report['elapsed']:>9.2f} {report['elapsed'] / base_time:>6.0%} "
+              f"{same:>5}/{len(base_moves)}")
+    return reports
+
+
+def print_report(report):
+    for index, result in enumerate(report['positions'], 1):
+        print(f"{index:2}. {result['move'] or '-':5} {result['score']:>8} "
+              f"{result['nodes']:>9} узлов {result['time']:7.2f} с")
+    print("=" * 40)
+    print(f"Глубина:        {report['depth']}")
+    print(f"Всего узлов:    {report['total_nodes']}")
+    print(f"  из них взятий: {report['total_qnodes']}")
+    print(f"Время:          {report['elapsed']:.2f} с")
+    print(f"Узлов/с:        {report['nps']}")
+    print(f"Подпись:        {report['signature']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Детерминированный замер скорости поиска")
+    parser.add_argument('--depth', type=int, default=5, help="глубина поиска (по умолчанию 5)")
+    parser.add_argument('--hash', type=int, default=16, help="размер хеш-таблицы, МБ")
+    parser.add_argument('--json', action='store_true', help="вывести результат в JSON")
+    parser.add_argument('--compare', action='store_true',
+                        help="сравнить поиск с нулевым ходом и LMR и без них")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare_selectivity(args.depth, args.hash)
+        return 0
+    report = run_bench(args.depth, args.hash)
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,469 @@
+from board import (Board, CAPTURE_FLAG, ZOBRIST_PIECES, PIECE_SCORES, decode_move, new_move_buffer,
+                   KNIGHT_OFFSETS, KING_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS)
+
+# Клетка кодируется индексом row * 8 + col (a8 = 0, h1 = 63),
+# то есть в том же порядке, что и строки Board.board
+SQUARE_POS = [(sq >> 3, sq & 7) for sq in range(64)]
+
+WHITE_PIECES = 'PNBRQK'
+BLACK_PIECES = 'pnbrqk'
+
+
+def _leaper_table(offsets):
+    table = []
+    for r, c in SQUARE_POS:
+        mask = 0
+        for dr, dc in offsets:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < 8 and 0 <= nc < 8:
+                mask |= 1 << (nr * 8 + nc)
+        table.append(mask)
+    return table
+
+
+def _ray_table(dr, dc):
+    table = []
+    for r, c in SQUARE_POS:
+        mask = 0
+        nr, nc = r + dr, c + dc
+        while 0 <= nr < 8 and 0 <= nc < 8:
+            mask |= 1 << (nr * 8 + nc)
+            nr, nc = nr + dr, nc + dc
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table(KNIGHT_OFFSETS)
+KING_ATTACKS = _leaper_table(KING_OFFSETS)
+# Клетки, которые бьет пешка соответствующего цвета
+WHITE_PAWN_ATTACKS = _leaper_table([(-1, -1), (-1, 1)])
+BLACK_PAWN_ATTACKS = _leaper_table([(1, -1), (1, 1)])
+
+# Для каждого направления: таблица лучей и признак того, что индекс клетки
+# вдоль луча растет (тогда ближайший блокер - младший бит, иначе - старший)
+ROOK_RAYS = [(_ray_table(dr, dc), dr * 8 + dc > 0) for dr, dc in ROOK_DIRECTIONS]
+BISHOP_RAYS = [(_ray_table(dr, dc), dr * 8 + dc > 0) for dr, dc in BISHOP_DIRECTIONS]
+
+FULL = (1 << 64) - 1
+
+
+def _between_table():
+    # BETWEEN[a][b] - клетки строго между a и b, если они на одной линии
+    table = [[0] * 64 for _ in range(64)]
+    for rays, _ in ROOK_RAYS + BISHOP_RAYS:
+        for a in range(64):
+            for b in iter_squares(rays[a]):
+                table[a][b] = (rays[a] ^ rays[b]) & ~(1 << b)
+    return table
+
+
+def slider_attacks(sq, occupied, rays):
+    attacks = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            # Отрезаем часть луча за первым блокером
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+
+def iter_squares(bb):
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def _nearest(bb, positive):
+    if positive:
+        return (bb & -bb).bit_length() - 1
+    return bb.bit_length() - 1
+
+
+BETWEEN = _between_table()
+
+
+class BitBoard(Board):
+    # Доска на битбордах: по 64-битному числу на каждый тип фигуры и цвет.
+    # Массив Board.board поддерживается синхронно, поэтому вывод доски и
+    # оценка позиции работают с BitBoard так же, как с Board.
+    @classmethod
+    def from_board(cls, board):
+        return cls.from_rows(board.board)
+
+    def reset_state(self):
+        super().reset_state()
+        self.pieces = dict.fromkeys(WHITE_PIECES + BLACK_PIECES, 0)
+        self.white = 0
+        self.black = 0
+        for sq, (i, j) in enumerate(SQUARE_POS):
+            piece = self.board[i][j]
+            if piece == '.':
+                continue
+            self.pieces[piece] |= 1 << sq
+            if piece.isupper():
+                self.white |= 1 << sq
+            else:
+                self.black |= 1 << sq
+
+    def copy(self):
+        new_board = super().copy()
+        new_board.pieces = dict(self.pieces)
+        new_board.white = self.white
+        new_board.black = self.black
+        return new_board
+
+    def make_move_code(self, code):
+        # То же, что Board.make_move_code, плюс битборды; записано целиком,
+        # без вызова базового класса - это самый частый метод поиска
+        from_sq = code >> 6 & 63
+        to_sq = code & 63
+        from_row = self.board[from_sq >> 3]
+        to_row = self.board[to_sq >> 3]
+        piece = from_row[from_sq & 7]
+        captured = to_row[to_sq & 7]
+        undo = (code, captured, self.hash, self.score)
+        to_row[to_sq & 7] = piece
+        from_row[from_sq & 7] = '.'
+
+        keys = ZOBRIST_PIECES[piece]
+        scores = PIECE_SCORES[piece]
+        self.hash ^= keys[from_sq] ^ keys[to_sq]
+        self.score += scores[to_sq] - scores[from_sq]
+        move_bits = 1 << from_sq | 1 << to_sq
+        self.pieces[piece] ^= move_bits
+        if piece.isupper():
+            self.white ^= move_bits
+        else:
+            self.black ^= move_bits
+        if captured != '.':
+            self.hash ^= ZOBRIST_PIECES[captured][to_sq]
+            self.score -= PIECE_SCORES[captured][to_sq]
+            self.piece_count -= 1
+            self._toggle_captured(captured, to_sq)
+            if captured in 'Kk':
+                self.king_pos[captured] = None
+        if piece in 'Kk':
+            self.king_pos[piece] = SQUARE_POS[to_sq]
+        self.undo_stack.append(undo)
+        return undo
+
+    def unmake_move(self):
+        code, captured, self.hash, self.score = self.undo_stack.pop()
+        from_sq = code >> 6 & 63
+        to_sq = code & 63
+        from_row = self.board[from_sq >> 3]
+        to_row = self.board[to_sq >> 3]
+        piece = to_row[to_sq & 7]
+        from_row[from_sq & 7] = piece
+        to_row[to_sq & 7] = captured
+
+        move_bits = 1 << from_sq | 1 << to_sq
+        self.pieces[piece] ^= move_bits
+        if piece.isupper():
+            self.white ^= move_bits
+        else:
+            self.black ^= move_bits
+        if piece in 'Kk':
+            self.king_pos[piece] = SQUARE_POS[from_sq]
+        if captured != '.':
+            self.piece_count += 1
+            self._toggle_captured(captured, to_sq)
+            if captured in 'Kk':
+                self.king_pos[captured] = SQUARE_POS[to_sq]
+        return captured
+
+    def _toggle_captured(self, captured, sq):
+        # XOR симметричен: снимает взятую фигуру с битбордов и возвращает ее
+        bit = 1 << sq
+        self.pieces[captured] ^= bit
+        if captured.isupper():
+            self.white ^= bit
+        else:
+            self.black ^= bit
+
+    def _targets(self, sq, piece):
+        if piece.isupper():
+            own, enemy = self.white, self.black
+        else:
+            own, enemy = self.black, self.white
+        kind = piece.upper()
+
+        if kind == 'N':
+            return KNIGHT_ATTACKS[sq] & ~own
+        if kind == 'K':
+            return KING_ATTACKS[sq] & ~own
+        if kind == 'P':
+            return self._pawn_targets(sq, piece.isupper(), own | enemy, enemy)
+
+        occupied = own | enemy
+        attacks = 0
+        if kind in 'RQ':
+            attacks |= slider_attacks(sq, occupied, ROOK_RAYS)
+        if kind in 'BQ':
+            attacks |= slider_attacks(sq, occupied, BISHOP_RAYS)
+        return attacks & ~own
+
+    def _pawn_targets(self, sq, is_white, occupied, enemy):
+        if is_white:
+            targets = WHITE_PAWN_ATTACKS[sq] & enemy
+            step, start_row = -8, 6
+        else:
+            targets = BLACK_PAWN_ATTACKS[sq] & enemy
+            step, start_row = 8, 1
+
+        # Ход вперед на одну и на две клетки с начальной позиции
+        one = sq + step
+        if 0 <= one < 64 and not occupied >> one & 1:
+            targets |= 1 << one
+            two = one + step
+            if sq >> 3 == start_row and not occupied >> two & 1:
+                targets |= 1 << two
+        return targets
+
+    def get_piece_moves(self, pos):
+        piece = self.board[pos[0]][pos[1]]
+        if piece == '.':
+            return []
+        targets = self._targets(pos[0] * 8 + pos[1], piece)
+        return [SQUARE_POS[to_sq] for to_sq in iter_squares(targets)]
+
+    def get_all_moves(self, is_white):
+        moves = []
+        for piece in (WHITE_PIECES if is_white else BLACK_PIECES):
+            for sq in iter_squares(self.pieces[piece]):
+                from_pos = SQUARE_POS[sq]
+                moves.extend((from_pos, SQUARE_POS[to_sq])
+                             for to_sq in iter_squares(self._targets(sq, piece)))
+        return moves
+
+    def _square_attacked(self, sq, by_white, occupied, removed=0):
+        # Атаки считаются "от клетки": если с sq фигурой данного типа
+        # можно попасть на фигуру противника того же типа, клетка атакована.
+        # removed - фигуры, снятые с доски (например, взятые гипотетическим ходом)
+        pieces = self.pieces
+        if by_white:
+            pawn, knight, bishop, rook, queen, king = (
+                pieces['P'], pieces['N'], pieces['B'], pieces['R'], pieces['Q'], pieces['K'])
+            pawn_attacks = BLACK_PAWN_ATTACKS
+        else:
+            pawn, knight, bishop, rook, queen, king = (
+                pieces['p'], pieces['n'], pieces['b'], pieces['r'], pieces['q'], pieces['k'])
+            pawn_attacks = WHITE_PAWN_ATTACKS
+        keep = ~removed
+
+        if pawn_attacks[sq] & pawn & keep:
+            return True
+        if KNIGHT_ATTACKS[sq] & knight & keep:
+            return True
+        if KING_ATTACKS[sq] & king & keep:
+            return True
+        rook_like = (rook | queen) & keep
+        if rook_like and slider_attacks(sq, occupied, ROOK_RAYS) & rook_like:
+            return True
+        bishop_like = (bishop | queen) & keep
+        if bishop_like and slider_attacks(sq, occupied, BISHOP_RAYS) & bishop_like:
+            return True
+        return False
+
+    def _attackers(self, sq, by_white, occupied):
+        # Все фигуры цвета by_white, атакующие клетку sq
+        pieces = self.pieces
+        if by_white:
+            pawn, knight, bishop, rook, queen, king = (
+                pieces['P'], pieces['N'], pieces['B'], pieces['R'], pieces['Q'], pieces['K'])
+            pawn_attacks = BLACK_PAWN_ATTACKS
+        else:
+            pawn, knight, bishop, rook, queen, king = (
+                pieces['p'], pieces['n'], pieces['b'], pieces['r'], pieces['q'], pieces['k'])
+            pawn_attacks = WHITE_PAWN_ATTACKS
+        return ((pawn_attacks[sq] & pawn) | (KNIGHT_ATTACKS[sq] & knight) |
+                (KING_ATTACKS[sq] & king) |
+                (slider_attacks(sq, occupied, ROOK_RAYS) & (rook | queen)) |
+                (slider_attacks(sq, occupied, BISHOP_RAYS) & (bishop | queen)))
+
+    def _pins(self, king_sq, is_white):
+        # Связанные фигуры: {клетка фигуры: маска клеток, куда ей можно ходить}
+        if is_white:
+            own = self.white
+            rook_like = self.pieces['r'] | self.pieces['q']
+            bishop_like = self.pieces['b'] | self.pieces['q']
+        else:
+            own = self.black
+            rook_like = self.pieces['R'] | self.pieces['Q']
+            bishop_like = self.pieces['B'] | self.pieces['Q']
+        occupied = self.white | self.black
+        pins = {}
+        for rays, sliders in ((ROOK_RAYS, rook_like), (BISHOP_RAYS, bishop_like)):
+            if not sliders:
+                continue
+            for table, positive in rays:
+                ray = table[king_sq]
+                if not ray & sliders:
+                    continue
+                blockers = ray & occupied
+                first = _nearest(blockers, positive)
+                if not own >> first & 1:
+                    continue
+                beyond = blockers & table[first]
+                if not beyond:
+                    continue
+                second = _nearest(beyond, positive)
+                if sliders >> second & 1:
+                    pins[first] = ray ^ table[second]
+        return pins
+
+    def _king_square(self, is_white):
+        king = self.pieces['K' if is_white else 'k']
+        return king.bit_length() - 1 if king else None
+
+    def is_square_attacked(self, square, by_white):
+        return self._square_attacked(square[0] * 8 + square[1], by_white, self.white | self.black)
+
+    def is_in_check(self, is_white):
+        king_sq = self._king_square(is_white)
+        if king_sq is None:
+            return False
+        return self._square_attacked(king_sq, not is_white, self.white | self.black)
+
+    def has_non_pawn_material(self, is_white):
+        pieces = self.pieces
+        if is_white:
+            return bool(pieces['N'] | pieces['B'] | pieces['R'] | pieces['Q'])
+        return bool(pieces['n'] | pieces['b'] | pieces['r'] | pieces['q'])
+
+    def _is_legal(self, from_sq, to_sq, is_white):
+        # Проверка без копирования доски: достаточно посмотреть,
+        # атакован ли король при занятости клеток после хода
+        from_bit = 1 << from_sq
+        to_bit = 1 << to_sq
+        king_sq = self._king_square(is_white)
+        if king_sq is None:
+            return True
+        if king_sq == from_sq:
+            king_sq = to_sq
+        occupied = ((self.white | self.black) & ~from_bit) | to_bit
+        return not self._square_attacked(king_sq, not is_white, occupied, to_bit)
+
+    def is_move_legal(self, move, is_white):
+        from_pos, to_pos = move
+        return self._is_legal(from_pos[0] * 8 + from_pos[1], to_pos[0] * 8 + to_pos[1], is_white)
+
+    def is_move_code_legal(self, code, is_white):
+        from_sq = code >> 6 & 63
+        to_sq = code & 63
+        if from_sq == to_sq:
+            return False
+        piece = self.board[from_sq >> 3][from_sq & 7]
+        if piece == '.' or piece.isupper() != is_white:
+            return False
+        enemy = self.black if is_white else self.white
+        if enemy >> to_sq & 1 != (1 if code & CAPTURE_FLAG else 0):
+            return False
+        if not self._targets(from_sq, piece) >> to_sq & 1:
+            return False
+        return self._is_legal(from_sq, to_sq, is_white)
+
+    def least_valuable_attacker(self, square, by_white):
+        attackers = self._attackers(square[0] * 8 + square[1], by_white, self.white | self.black)
+        if not attackers:
+            return None
+        for piece in (WHITE_PIECES if by_white else BLACK_PIECES):
+            bb = attackers & self.pieces[piece]
+            if bb:
+                return SQUARE_POS[(bb & -bb).bit_length() - 1]
+        return None
+
+    def generate_legal_moves(self, is_white, captures_only=False, quiets_only=False):
+        buffer = new_move_buffer()
+        count, in_check = self.generate_moves(buffer, is_white, captures_only, quiets_only)
+        return [decode_move(code) for code in buffer[:count]], in_check
+
+    def generate_moves(self, buffer, is_white, captures_only=False, quiets_only=False):
+        # Шахующие фигуры и связки считаются один раз на позицию, после чего
+        # ходы фильтруются масками, без проверки шаха после каждого хода.
+        # Коды ходов пишутся в buffer, новые объекты на ход не создаются
+        king_sq = self._king_square(is_white)
+        if king_sq is None:
+            return Board.generate_moves(self, buffer, is_white, captures_only, quiets_only)
+        own = self.white if is_white else self.black
+        occupied = self.white | self.black
+        enemy = occupied ^ own
+        # Маска допустимых клеток назначения
+        if captures_only:
+            targets_mask = enemy
+        elif quiets_only:
+            targets_mask = FULL & ~occupied
+        else:
+            targets_mask = FULL
+        checkers = self._attackers(king_sq, not is_white, occupied)
+
+        # Король: клетка не должна быть под боем при занятости без самого короля
+        count = 0
+        king_from = king_sq << 6
+        without_king = occupied ^ (1 << king_sq)
+        for to_sq in iter_squares(KING_ATTACKS[king_sq] & ~own & targets_mask):
+            if not self._square_attacked(to_sq, not is_white, without_king, 1 << to_sq):
+                buffer[count] = king_from | to_sq | (CAPTURE_FLAG if enemy >> to_sq & 1 else 0)
+                count += 1
+
+        if checkers:
+            if checkers & (checkers - 1):
+                # Двойной шах - ходит только король
+                return count, True
+            checker_sq = checkers.bit_length() - 1
+            # Взять шахующую фигуру или закрыться
+            check_mask = (checkers | BETWEEN[king_sq][checker_sq]) & targets_mask
+        else:
+            check_mask = targets_mask
+
+        pins = self._pins(king_sq, is_white)
+        allowed = check_mask & ~own
+        pieces = self.pieces
+        if is_white:
+            pawn, knight, bishop, rook, queen = 'P', 'N', 'B', 'R', 'Q'
+        else:
+            pawn, knight, bishop, rook, queen = 'p', 'n', 'b', 'r', 'q'
+
+        # Цикл по фигурам каждого типа отдельно: без разбора типа фигуры
+        # и без генераторов на каждую фигуру
+        for kind, bb in ((pawn, pieces[pawn]), (knight, pieces[knight]),
+                         (bishop, pieces[bishop]), (rook, pieces[rook]), (queen, pieces[queen])):
+            while bb:
+                lsb = bb & -bb
+                bb ^= lsb
+                sq = lsb.bit_length() - 1
+                if kind == knight:
+                    targets = KNIGHT_ATTACKS[sq] & allowed
+                elif kind == pawn:
+                    targets = self._pawn_targets(sq, is_white, occupied, enemy) & check_mask
+                elif kind == bishop:
+                    targets = slider_attacks(sq, occupied, BISHOP_RAYS) & allowed
+                elif kind == rook:
+                    targets = slider_attacks(sq, occupied, ROOK_RAYS) & allowed
+                else:
+                    targets = (slider_attacks(sq, occupied, ROOK_RAYS) |
+                               slider_attacks(sq, occupied, BISHOP_RAYS)) & allowed
+                if sq in pins:
+                    targets &= pins[sq]
+                if targets:
+                    from_code = sq << 6
+                    captures = targets & enemy
+                    targets ^= captures
+                    while captures:
+                        to_bit = captures & -captures
+                        captures ^= to_bit
+                        buffer[count] = from_code | CAPTURE_FLAG | (to_bit.bit_length() - 1)
+                        count += 1
+                    while targets:
+                        to_bit = targets & -targets
+                        targets ^= to_bit
+                        buffer[count] = from_code | (to_bit.bit_length() - 1)
+                        count += 1
+        return count, bool(checkers)
@@ -1,3 +1,98 @@
+import random
+from array import array
+
+# Ключи Зобриста: случайное 64-битное число на каждую пару (фигура, клетка).
+# Генератор с фиксированным зерном, чтобы ключи совпадали между запусками.
+_zobrist_random = random.Random(20241113)
+ZOBRIST_PIECES = {piece: [_zobrist_random.getrandbits(64) for _ in range(64)]
+                  for piece in 'PNBRQKpnbrqk'}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+
+KNIGHT_OFFSETS = [(2, 1), (2, -1), (-2, 1), (-2, -1),
+                  (1, 2), (1, -2), (-1, 2), (-1, -2)]
+KING_OFFSETS = [(0, 1), (0, -1), (1, 0), (-1, 0),
+                (1, 1), (1, -1), (-1, 1), (-1, -1)]
+ROOK_DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+PIECE_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000}
+
+
+def _centre_bonus(sq):
+    # Бонус за позицию (центр доски ценнее): 4 минус манхэттенское расстояние до центра
+    return 4 - int(abs(3.5 - sq // 8) + abs(3.5 - sq % 8))
+
+
+# Позиционные таблицы для белых (клетка a8 = 0); для черных зеркалируются
+PIECE_SQUARE_TABLES = {
+    'P': [_centre_bonus(sq) for sq in range(64)],
+    'N': [_centre_bonus(sq) for sq in range(64)],
+    'B': [_centre_bonus(sq) for sq in range(64)],
+    'R': [0] * 64,
+    'Q': [0] * 64,
+    'K': [0] * 64,
+}
+
+# Материал + позиция для каждой пары (фигура, клетка) с точки зрения белых
+PIECE_SCORES = {}
+for _piece, _value in PIECE_VALUES.items():
+    _table = PIECE_SQUARE_TABLES[_piece]
+    PIECE_SCORES[_piece] = [_value + _table[sq] for sq in range(64)]
+    PIECE_SCORES[_piece.lower()] = [-(_value + _table[sq ^ 56]) for sq in range(64)]
+
+
+# Код хода - 16-битное целое: биты 0-5 - клетка назначения, 6-11 - исходная
+# клетка (клетка = строка * 8 + столбец, a8 = 0), бит 12 - взятие. Биты 13-15
+# оставлены под фигуру превращения, которого в этой игре нет. Ход с клетки
+# на нее же невозможен, поэтому 0 означает "нет хода"
+NO_MOVE = 0
+CAPTURE_FLAG = 1 << 12
+SQUARES_MASK = 0xFFF
+# Размер буфера ходов: в шахматной позиции не бывает больше 218 легальных ходов
+MAX_MOVES = 256
+
+# Кортежи ходов для всех пар клеток, чтобы декодирование не создавало объектов
+_SQUARES = [(sq >> 3, sq & 7) for sq in range(64)]
+_MOVE_TUPLES = [(_SQUARES[code >> 6], _SQUARES[code & 63]) for code in range(4096)]
+_MOVE_TUPLES[NO_MOVE] = None
+
+
+def encode_move(move, capture=False):
+    # ((6, 4), (4, 4)) -> код хода
+    if move is None:
+        return NO_MOVE
+    from_pos, to_pos = move
+    code = (from_pos[0] * 8 + from_pos[1]) << 6 | (to_pos[0] * 8 + to_pos[1])
+    return code | CAPTURE_FLAG if capture else code
+
+
+def decode_move(code):
+    # Код хода -> ((6, 4), (4, 4)); флаги отбрасываются
+    return _MOVE_TUPLES[code & SQUARES_MASK]
+
+
+def new_move_buffer():
+    # Буфер для генерации ходов одного узла поиска
+    return array('H', bytes(2 * MAX_MOVES))
+
+
+def format_move(move):
+    # ((6, 4), (4, 4)) -> 'e2e4'
+    (fr, fc), (tr, tc) = move
+    return f"{chr(ord('a') + fc)}{8 - fr}{chr(ord('a') + tc)}{8 - tr}"
+
+
+def parse_move(text):
+    # 'e2e4' -> ((6, 4), (4, 4))
+    text = text.strip().lower()
+    if (len(text) != 4 or text[0] not in 'abcdefgh' or text[2] not in 'abcdefgh' or
+            text[1] not in '12345678' or text[3] not in '12345678'):
+        raise ValueError(f"Неверный ход: {text}")
+    from_pos = (8 - int(text[1]), ord(text[0]) - ord('a'))
+    to_pos = (8 - int(text[3]), ord(text[2]) - ord('a'))
+    return (from_pos, to_pos)
+
+
 class Board:
     def __init__(self):
         self.board = [
@@ -10,16 +105,176 @@ class Board:
             ['P', 'P', 'P', 'P', 'P', 'P', 'P', 'P'],
             ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']
         ]
+        # Записи для отмены ходов: (ход, взятая фигура, прежний хеш, прежняя оценка)
+        self.undo_stack = []
+        self.reset_state()
+        
+    @classmethod
+    def from_rows(cls, rows):
+        # Доска из 8 строк вида 'rnbqkbnr' (от 8-й горизонтали к 1-й)
+        new_board = cls()
+        new_board.board = [list(row) for row in rows]
+        new_board.reset_state()
+        return new_board
+        
+    @classmethod
+    def from_placement(cls, placement):
+        # Доска из расстановки в нотации FEN: 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR'
+        rows = []
+        for rank in placement.split('/'):
+            row = ''
+            for ch in rank:
+                if ch in '12345678':
+                    row += '.' * int(ch)
+                elif ch in 'PNBRQKpnbrqk':
+                    row += ch
+                else:
+                    raise ValueError(f"Неверный символ в расстановке: {ch}")
+            if len(row) != 8:
+                raise ValueError(f"Неверная горизонталь в расстановке: {rank}")
+            rows.append(row)
+        if len(rows) != 8:
+            raise ValueError(f"Неверная расстановка: {placement}")
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_fen(cls, fen):
+        # Позиция в нотации FEN или EPD -> (доска, ход белых). Рокировки,
+        # взятия на проходе и счетчики ходов в этой игре не используются,
+        # поэтому эти поля допускаются, но не разбираются
+        fields = fen.split()
+        if len(fields) < 2 or fields[1] not in ('w', 'b'):
+            raise ValueError(f"Неверная позиция FEN: {fen}")
+        board = cls.from_placement(fields[0])
+        is_white = fields[1] == 'w'
+        for king in 'Kk':
+            if sum(row.count(king) for row in board.board) != 1:
+                raise ValueError(f"На доске должно быть по одному королю: {fen}")
+        if board.is_in_check(not is_white):
+            raise ValueError(f"Король стороны, которая не ходит, под шахом: {fen}")
+        return board, is_white
+
+    def to_placement(self):
+        # Расстановка в нотации FEN: 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR'
+        ranks = []
+        for row in self.board:
+            rank = ''
+            empty = 0
+            for piece in row:
+                if piece == '.':
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += piece
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        return '/'.join(ranks)
+
+    def to_fen(self, is_white):
+        return f"{self.to_placement()} {'w' if is_white else 'b'} - - 0 1"
+        
+    def reset_state(self):
+        # Пересчет всего, что выводится из расстановки фигур; вызывается
+        # после того, как Board.board заполнен напрямую
+        self.hash = self.compute_hash()
+        self.score = self.compute_score()
+        self.king_pos = {'K': None, 'k': None}
+        self.piece_count = 0
+        for i in range(8):
+            for j in range(8):
+                if self.board[i][j] in self.king_pos:
+                    self.king_pos[self.board[i][j]] = (i, j)
+                if self.board[i][j] != '.':
+                    self.piece_count += 1
+        
+    def compute_hash(self):
+        # Полный пересчет ключа Зобриста (без учета очереди хода)
+        key = 0
+        for i in range(8):
+            for j in range(8):
+                piece = self.board[i][j]
+                if piece != '.':
+                    key ^= ZOBRIST_PIECES[piece][i * 8 + j]
+        return key
+        
+    def compute_score(self):
+        # Полный пересчет материала и позиционной оценки (в пользу белых)
+        score = 0
+        for i in range(8):
+            for j in range(8):
+                piece = self.board[i][j]
+                if piece != '.':
+                    score += PIECE_SCORES[piece][i * 8 + j]
+        return score
+        
+    def position_key(self, is_white):
+        # Ключ позиции с учетом того, чей ход
+        return self.hash if is_white else self.hash ^ ZOBRIST_BLACK_TO_MOVE
         
     def copy(self):
-        new_board = Board()
+        new_board = self.__class__.__new__(self.__class__)
         new_board.board = [row[:] for row in self.board]
+        new_board.undo_stack = self.undo_stack[:]
+        new_board.hash = self.hash
+        new_board.score = self.score
+        new_board.king_pos = dict(self.king_pos)
+        new_board.piece_count = self.piece_count
         return new_board
         
     def make_move(self, move):
-        from_pos, to_pos = move
-        self.board[to_pos[0]][to_pos[1]] = self.board[from_pos[0]][from_pos[1]]
-        self.board[from_pos[0]][from_pos[1]] = '.'
+        # Ход ((r1, c1), (r2, c2)); поиск делает ходы сразу по коду
+        return self.make_move_code(encode_move(move))
+
+    def make_move_code(self, code):
+        # Ход делается на месте, запись для отмены кладется в стек
+        from_sq = code >> 6 & 63
+        to_sq = code & 63
+        from_row = self.board[from_sq >> 3]
+        to_row = self.board[to_sq >> 3]
+        piece = from_row[from_sq & 7]
+        captured = to_row[to_sq & 7]
+        undo = (code, captured, self.hash, self.score)
+        
+        to_row[to_sq & 7] = piece
+        from_row[from_sq & 7] = '.'
+        
+        # Инкрементальное обновление ключа Зобриста
+        keys = ZOBRIST_PIECES[piece]
+        self.hash ^= keys[from_sq] ^ keys[to_sq]
+        # и оценки позиции
+        scores = PIECE_SCORES[piece]
+        self.score += scores[to_sq] - scores[from_sq]
+        if captured != '.':
+            self.hash ^= ZOBRIST_PIECES[captured][to_sq]
+            self.score -= PIECE_SCORES[captured][to_sq]
+            self.piece_count -= 1
+            if captured in 'Kk':
+                self.king_pos[captured] = None
+        if piece in 'Kk':
+            self.king_pos[piece] = _SQUARES[to_sq]
+        
+        self.undo_stack.append(undo)
+        return undo
+        
+    def unmake_move(self):
+        code, captured, self.hash, self.score = self.undo_stack.pop()
+        from_sq = code >> 6 & 63
+        to_sq = code & 63
+        from_row = self.board[from_sq >> 3]
+        to_row = self.board[to_sq >> 3]
+        piece = to_row[to_sq & 7]
+        from_row[from_sq & 7] = piece
+        to_row[to_sq & 7] = captured
+        if piece in 'Kk':
+            self.king_pos[piece] = _SQUARES[from_sq]
+        if captured != '.':
+            self.piece_count += 1
+            if captured in 'Kk':
+                self.king_pos[captured] = _SQUARES[to_sq]
+        return captured
         
     def get_all_moves(self, is_white):
         moves = []
@@ -151,46 +406,250 @@ class Board:
                 
         return moves
         
-    def is_in_check(self, is_white):
-        # Найдем позицию короля
-        king_pos = None
-        king = 'K' if is_white else 'k'
-        for i in range(8):
-            for j in range(8):
-                if self.board[i][j] == king:
-                    king_pos = (i, j)
-                    break
-            if king_pos:
-                break
+    def is_square_attacked(self, square, by_white):
+        # Вместо генерации всех ходов противника "смотрим" из клетки наружу:
+        # лучами ладьи и слона, прыжками коня, ходами короля и пешки
+        r, c = square
+        board = self.board
+        if by_white:
+            pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+            pawn_row = r + 1
+        else:
+            pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+            pawn_row = r - 1
+            
+        if 0 <= pawn_row < 8:
+            if c > 0 and board[pawn_row][c - 1] == pawn:
+                return True
+            if c < 7 and board[pawn_row][c + 1] == pawn:
+                return True
                 
-        # Проверим, может ли какая-либо фигура противника атаковать короля
-        for i in range(8):
-            for j in range(8):
-                piece = self.board[i][j]
-                if piece != '.' and self.is_piece_color(piece, not is_white):
-                    moves = self.get_piece_moves((i, j))
-                    if king_pos in moves:
-                        return True
+        for dr, dc in KNIGHT_OFFSETS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < 8 and 0 <= nc < 8 and board[nr][nc] == knight:
+                return True
+                
+        for dr, dc in KING_OFFSETS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < 8 and 0 <= nc < 8 and board[nr][nc] == king:
+                return True
+                
+        for directions, slider in ((ROOK_DIRECTIONS, rook), (BISHOP_DIRECTIONS, bishop)):
+            for dr, dc in directions:
+                nr, nc = r + dr, c + dc
+                while 0 <= nr < 8 and 0 <= nc < 8:
+                    target = board[nr][nc]
+                    if target != '.':
+                        if target == slider or target == queen:
+                            return True
+                        break
+                    nr, nc = nr + dr, nc + dc
         return False
+        
+    def is_in_check(self, is_white):
+        # Позиция короля кешируется и обновляется в make_move / unmake_move
+        king_pos = self.king_pos['K' if is_white else 'k']
+        if king_pos is None:
+            return False
+        return self.is_square_attacked(king_pos, not is_white)
+
+    def has_non_pawn_material(self, is_white):
+        # Есть ли у стороны фигуры, кроме короля и пешек
+        pieces = 'NBRQ' if is_white else 'nbrq'
+        return any(piece in pieces for row in self.board for piece in row)
 
     def is_move_legal(self, move, is_white):
         # Проверяем, не оставляет ли ход короля под шахом
-        new_board = self.copy()
-        new_board.make_move(move)
-        return not new_board.is_in_check(is_white)
+        self.make_move(move)
+        legal = not self.is_in_check(is_white)
+        self.unmake_move()
+        return legal
+
+    def is_move_code_legal(self, code, is_white):
+        # Проверка отдельного хода-кода (из хеш-таблицы, ход-убийца) без
+        # генерации всех ходов: фигура своя, флаг взятия соответствует
+        # клетке назначения, фигура туда ходит и король не остается под шахом
+        move = decode_move(code)
+        if move is None:
+            return False
+        (fr, fc), (tr, tc) = move
+        piece = self.board[fr][fc]
+        if piece == '.' or not self.is_piece_color(piece, is_white):
+            return False
+        if (self.board[tr][tc] != '.') != bool(code & CAPTURE_FLAG):
+            return False
+        if (tr, tc) not in self.get_piece_moves((fr, fc)):
+            return False
+        return Board.is_move_legal(self, move, is_white)
+
+    def _checks_and_pins(self, king_pos, is_white):
+        # Один проход лучами от короля: шахующие фигуры, клетки, которыми
+        # можно закрыться от шаха или взять шахующую фигуру, и связки
+        # {позиция связанной фигуры: клетки, по которым она может ходить}
+        r, c = king_pos
+        board = self.board
+        if is_white:
+            pawn, knight, bishop, rook, queen = 'p', 'n', 'b', 'r', 'q'
+            pawn_row = r - 1
+        else:
+            pawn, knight, bishop, rook, queen = 'P', 'N', 'B', 'R', 'Q'
+            pawn_row = r + 1
+        checkers = 0
+        check_squares = set()
+        pins = {}
+        
+        if 0 <= pawn_row < 8:
+            for nc in (c - 1, c + 1):
+                if 0 <= nc < 8 and board[pawn_row][nc] == pawn:
+                    checkers += 1
+                    check_squares.add((pawn_row, nc))
+                    
+        for dr, dc in KNIGHT_OFFSETS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < 8 and 0 <= nc < 8 and board[nr][nc] == knight:
+                checkers += 1
+                check_squares.add((nr, nc))
+                
+        for directions, slider in ((ROOK_DIRECTIONS, rook), (BISHOP_DIRECTIONS, bishop)):
+            for dr, dc in directions:
+                ray = []
+                pinned = None
+                nr, nc = r + dr, c + dc
+                while 0 <= nr < 8 and 0 <= nc < 8:
+                    ray.append((nr, nc))
+                    target = board[nr][nc]
+                    if target != '.':
+                        if target == slider or target == queen:
+                            if pinned is None:
+                                checkers += 1
+                                check_squares.update(ray)
+                            else:
+                                pins[pinned] = set(ray)
+                            break
+                        if pinned is None and self.is_piece_color(target, is_white):
+                            pinned = (nr, nc)
+                        else:
+                            break
+                    nr, nc = nr + dr, nc + dc
+        return checkers, check_squares, pins
+        
+    def least_valuable_attacker(self, square, by_white):
+        # Позиция самой дешевой фигуры цвета by_white, бьющей клетку (для размена)
+        r, c = square
+        board = self.board
+        if by_white:
+            pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+            pawn_row = r + 1
+        else:
+            pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+            pawn_row = r - 1
+            
+        if 0 <= pawn_row < 8:
+            for nc in (c - 1, c + 1):
+                if 0 <= nc < 8 and board[pawn_row][nc] == pawn:
+                    return (pawn_row, nc)
+        for dr, dc in KNIGHT_OFFSETS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < 8 and 0 <= nc < 8 and board[nr][nc] == knight:
+                return (nr, nc)
+                
+        # Первые фигуры на лучах: сначала слоны и ладьи, потом ферзи
+        hits = {}
+        for directions, slider in ((BISHOP_DIRECTIONS, bishop), (ROOK_DIRECTIONS, rook)):
+            for dr, dc in directions:
+                nr, nc = r + dr, c + dc
+                while 0 <= nr < 8 and 0 <= nc < 8:
+                    target = board[nr][nc]
+                    if target != '.':
+                        if target == slider or target == queen:
+                            hits.setdefault(target, (nr, nc))
+                        break
+                    nr, nc = nr + dr, nc + dc
+        for piece in (bishop, rook, queen):
+            if piece in hits:
+                return hits[piece]
+                
+        for dr, dc in KING_OFFSETS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < 8 and 0 <= nc < 8 and board[nr][nc] == king:
+                return (nr, nc)
+        return None
+        
+    def generate_legal_moves(self, is_white, captures_only=False, quiets_only=False):
+        # Сразу легальные ходы, без пробного хода и проверки шаха после него.
+        # Возвращает (ходы, под шахом ли король); captures_only - только взятия,
+        # quiets_only - только тихие ходы
+        king = 'K' if is_white else 'k'
+        king_pos = self.king_pos[king]
+        if king_pos is None:
+            moves = self.get_all_moves(is_white)
+            if captures_only or quiets_only:
+                moves = [move for move in moves
+                         if (self.board[move[1][0]][move[1][1]] != '.') == captures_only]
+            return moves, False
+        checkers, check_squares, pins = self._checks_and_pins(king_pos, is_white)
+        
+        moves = []
+        # Король: клетка не должна быть под боем; сам король снимается с доски,
+        # чтобы не загораживать луч шахующей фигуры
+        king_targets = self._get_king_moves(king_pos)
+        self.board[king_pos[0]][king_pos[1]] = '.'
+        for to_pos in king_targets:
+            if captures_only and self.board[to_pos[0]][to_pos[1]] == '.':
+                continue
+            if quiets_only and self.board[to_pos[0]][to_pos[1]] != '.':
+                continue
+            if not self.is_square_attacked(to_pos, not is_white):
+                moves.append((king_pos, to_pos))
+        self.board[king_pos[0]][king_pos[1]] = king
+        
+        # При двойном шахе ходить может только король
+        if checkers > 1:
+            return moves, True
+            
+        for i in range(8):
+            for j in range(8):
+                piece = self.board[i][j]
+                if piece == king or not self.is_piece_color(piece, is_white):
+                    continue
+                pin = pins.get((i, j))
+                for to_pos in self.get_piece_moves((i, j)):
+                    if captures_only and self.board[to_pos[0]][to_pos[1]] == '.':
+                        continue
+                    if quiets_only and self.board[to_pos[0]][to_pos[1]] != '.':
+                        continue
+                    if pin is not None and to_pos not in pin:
+                        continue
+                    if checkers and to_pos not in check_squares:
+                        continue
+                    moves.append(((i, j), to_pos))
+        return moves, checkers > 0
+        
+    def generate_moves(self, buffer, is_white, captures_only=False, quiets_only=False):
+        # Легальные ходы в виде кодов в буфер buffer (array('H')).
+        # Возвращает (число ходов, под шахом ли король)
+        moves, in_check = Board.generate_legal_moves(self, is_white, captures_only, quiets_only)
+        board = self.board
+        for index, move in enumerate(moves):
+            to_pos = move[1]
+            buffer[index] = encode_move(move, board[to_pos[0]][to_pos[1]] != '.')
+        return len(moves), in_check
 
     def get_legal_moves(self, is_white):
-        # Получаем все возможные ходы и фильтруем те, которые оставляют короля под шахом
-        all_moves = self.get_all_moves(is_white)
-        return [move for move in all_moves if self.is_move_legal(move, is_white)]
+        return self.generate_legal_moves(is_white)[0]
+        
+    def get_legal_captures(self, is_white):
+        return self.generate_legal_moves(is_white, captures_only=True)[0]
 
     def is_checkmate(self, is_white):
         # Мат - это когда король под шахом и нет легальных ходов
-        return self.is_in_check(is_white) and len(self.get_legal_moves(is_white)) == 0
+        moves, in_check = self.generate_legal_moves(is_white)
+        return in_check and not moves
 
     def is_stalemate(self, is_white):
         # Пат - это когда король не под шахом, но нет легальных ходов
-        return not self.is_in_check(is_white) and len(self.get_legal_moves(is_white)) == 0
+        moves, in_check = self.generate_legal_moves(is_white)
+        return not in_check and not moves
 
     def is_valid_move(self, move, is_white):
         from_pos, to_pos = move
@@ -202,5 +661,4 @@ class Board:
         if piece == '.' or self.is_piece_color(piece, not is_white):
             return False
             
-        valid_moves = self.get_piece_moves(from_pos)
-        return to_pos in valid_moves and self.is_move_legal(move, is_white)
\ No newline at end of file
+        return (from_pos, to_pos) in self.get_legal_moves(is_white)
\ No newline at end of file
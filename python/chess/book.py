@@ -0,0 +1,146 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+
+from board import Board, format_move, parse_move, encode_move, decode_move
+
+# Файл книги: заголовок (сигнатура, число записей) и записи фиксированной
+# длины (ключ позиции, ход, вес), отсортированные по ключу. Файл читается
+# через mmap с двоичным поиском, поэтому ни время открытия, ни расход
+# памяти не зависят от размера книги.
+MAGIC = b'CHESSBK1'
+HEADER = struct.Struct('<8sII')
+ENTRY = struct.Struct('<QHH')
+MAX_WEIGHT = 0xFFFF
+
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')
+
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_BOOK):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, _ = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or HEADER.size + self.count * ENTRY.size > len(self.data):
+            self.close()
+            raise ValueError(f"Файл не является дебютной книгой: {path}")
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _entry(self, index):
+        return ENTRY.unpack_from(self.data, HEADER.size + index * ENTRY.size)
+
+    def get_moves(self, board, is_white):
+        # Все ходы книги для позиции: [(ход, вес), ...]
+        key = board.position_key(is_white)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        moves = []
+        while lo < self.count:
+            entry_key, move, weight = self._entry(lo)
+            if entry_key != key:
+                break
+            moves.append((decode_move(move), weight))
+            lo += 1
+        return moves
+
+    def choose_move(self, board, is_white, rng=random, legal=None):
+        # Случайный ход с вероятностью, пропорциональной весу. Ходы, которые
+        # нелегальны в текущей позиции (совпадение ключей), отбрасываются;
+        # legal - уже известный список легальных ходов
+        if legal is None:
+            legal = board.get_legal_moves(is_white)
+        candidates = [(move, weight) for move, weight in self.get_moves(board, is_white)
+                      if move in legal]
+        if not candidates:
+            return None
+        total = sum(weight for _, weight in candidates)
+        pick = rng.uniform(0, total)
+        for move, weight in candidates:
+            pick -= weight
+            if pick <= 0:
+                return move
+        return candidates[-1][0]
+
+
+def build_book(lines, max_ply=30):
+    # Разбор линий вида 'e2e4 e7e5 g1f3 ...'; вес хода - число линий,
+    # в которых он встречается в данной позиции
+    weights = {}
+    for line_number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        board = Board()
+        is_white = True
+        for ply, text in enumerate(line.split()):
+            if ply >= max_ply:
+                break
+            move = parse_move(text)
+            if move not in board.get_legal_moves(is_white):
+                raise ValueError(f"Строка {line_number}: недопустимый ход {text}")
+            key = (board.position_key(is_white), encode_move(move))
+            weights[key] = min(weights.get(key, 0) + 1, MAX_WEIGHT)
+            board.make_move(move)
+            is_white = not is_white
+    return weights
+
+
+def write_book(weights, path):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(weights), 0))
+        for (key, move), weight in sorted(weights.items()):
+            f.write(ENTRY.pack(key, move, weight))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Дебютная книга")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="собрать книгу из текстового файла линий")
+    build.add_argument('source', help="текстовый файл: одна линия ходов на строку")
+    build.add_argument('output', nargs='?', default=DEFAULT_BOOK, help="файл книги")
+    build.add_argument('--max-ply', type=int, default=30, help="сколько полуходов линии брать")
+    probe = commands.add_parser('probe', help="ходы книги после заданной последовательности")
+    probe.add_argument('moves', nargs='*', help="ходы от начальной позиции, например e2e4 e7e5")
+    probe.add_argument('--book', default=DEFAULT_BOOK, help="файл книги")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        with open(args.source, encoding='utf-8') as f:
+            weights = build_book(f, args.max_ply)
+        write_book(weights, args.output)
+        print(f"Записей: {len(weights)}, файл: {args.output}")
+        return 0
+
+    board = Board()
+    is_white = True
+    for text in args.moves:
+        board.make_move(parse_move(text))
+        is_white = not is_white
+    with OpeningBook(args.book) as book:
+        moves = book.get_moves(board, is_white)
+    if not moves:
+        print("Позиции нет в книге")
+    for move, weight in sorted(moves, key=lambda item: -item[1]):
+        print(f"{format_move(move)}: {weight}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,16 @@ PyInstaller.__main__.run([
     '--onefile',
     '--name=ChessGame',
     '--add-data=board.py;.',
+    '--add-data=bitboard.py;.',
     '--add-data=ai.py;.',
+    '--add-data=transposition.py;.',
+    '--add-data=book.py;.',
+    '--add-data=book.bin;.',
+    '--add-data=tablebase.py;.',
+    '--add-data=ponder.py;.',
+    '--add-data=stats.py;.',
+    '--add-data=batch_eval.py;.',
+    '--add-data=analysis_cache.py;.',
+    '--add-data=game_state.py;.',
     '--console',
 ]) 
\ No newline at end of file
@@ -1,5 +1,14 @@
-from board import Board
-from ai import negamax
+from bitboard import BitBoard
+from board import format_move, parse_move
+from ai import AI, MATE_BOUND, MAX_DEPTH
+from transposition import TranspositionTable
+from book import OpeningBook
+from tablebase import Tablebases
+from ponder import Ponderer
+from stats import append_log
+from analysis_cache import AnalysisCache, DEFAULT_CACHE
+from game_state import GameStates, CHECKMATE, STALEMATE
+import argparse
 import time
 import sys
 
@@ -24,13 +33,8 @@ def get_user_move():
             move = input("Ваш ход (например, e2e4): ").strip().lower()
             if move in ['quit', 'exit', 'q']:
                 raise KeyboardInterrupt
-            if len(move) == 4:
-                from_pos = (8 - int(move[1]), ord(move[0]) - ord('a'))
-                to_pos = (8 - int(move[3]), ord(move[2]) - ord('a'))
-                return (from_pos, to_pos)
-        except KeyboardInterrupt:
-            raise
-        except:
+            return parse_move(move)
+        except ValueError:
             pass
         print("Неверный формат хода. Используйте формат 'e2e4' или 'quit' для выхода")
 
@@ -41,40 +45,81 @@ def get_difficulty():
         print("2. Средний (глубина 3)")
         print("3. Сложный (глубина 4)")
         print("4. Очень сложный (глубина 5)")
+        print("5. Блиц (1 секунда на ход)")
+        print("6. Быстрые (5 секунд на ход)")
+        print("7. Классика (15 секунд на ход)")
         
         try:
-            choice = input("Введите номер (1-4) или 'q' для выхода: ").lower()
+            choice = input("Введите номер (1-7) или 'q' для выхода: ").lower()
             if choice in ['quit', 'exit', 'q']:
                 raise KeyboardInterrupt
             choice = int(choice)
-            if 1 <= choice <= 4:
-                depths = {1: 2, 2: 3, 3: 4, 4: 5}
-                return depths[choice]
+            # (максимальная глубина, время на ход в секундах)
+            levels = {1: (2, None), 2: (3, None), 3: (4, None), 4: (5, None),
+                      5: (MAX_DEPTH, 1), 6: (MAX_DEPTH, 5), 7: (MAX_DEPTH, 15)}
+            if choice in levels:
+                return levels[choice]
         except KeyboardInterrupt:
             raise
         except ValueError:
             pass
-        print("Пожалуйста, введите число от 1 до 4")
+        print("Пожалуйста, введите число от 1 до 7")
+
+def get_pondering():
+    # Размышлять ли компьютеру, пока игрок думает над ходом (по умолчанию да)
+    while True:
+        choice = input("Думать во время вашего хода? (да/нет, по умолчанию да): ").strip().lower()
+        if choice in ['quit', 'exit', 'q']:
+            raise KeyboardInterrupt
+        if choice in ['', 'д', 'да', 'yes', 'y']:
+            return True
+        if choice in ['н', 'нет', 'no', 'n']:
+            return False
+        print("Пожалуйста, ответьте 'да' или 'нет'")
 
-def play_game():
+def play_game(show_stats=False, stats_log=None, cache_path=DEFAULT_CACHE):
     print("Добро пожаловать в шахматы!")
     print("Для выхода в любой момент нажмите Ctrl+C или введите 'quit'")
     
+    ponderer = None
+    cache = None
     try:
-        depth = get_difficulty()
-        board = Board()
+        max_depth, time_limit = get_difficulty()
+        pondering = get_pondering()
+        board = BitBoard()
+        tt = TranspositionTable()
+        try:
+            book = OpeningBook()
+        except (OSError, ValueError):
+            book = None
+        if cache_path is not None:
+            try:
+                cache = AnalysisCache(cache_path)
+            except (OSError, ValueError) as error:
+                print(f"Кэш анализа недоступен: {error}")
+        # Легальные ходы, шах и результат считаются один раз на позицию
+        # и используются и здесь, и в корне поиска
+        states = GameStates()
+        ai = AI(tt, book=book, tablebase=Tablebases(), cache=cache, states=states)
+        if pondering:
+            ponderer = Ponderer(ai)
         
         while True:
             print_board(board)
+            state = states.get(board, True)
             
-            if board.is_in_check(True):
+            if state.in_check:
                 print("Шах белому королю!")
             
+            # Пока игрок думает, компьютер ищет ответ на его ожидаемый ход
+            if ponderer is not None:
+                ponderer.start(board, True, max_depth)
+
             # Ход игрока
             while True:
                 try:
                     move = get_user_move()
-                    if board.is_valid_move(move, is_white=True):
+                    if state.is_legal(move):
                         board.make_move(move)
                         break
                     print("Недопустимый ход! Возможно, король останется под шахом.")
@@ -82,11 +127,12 @@ def play_game():
                     print("\nИгра прервана")
                     return
             
-            if board.is_checkmate(False):
+            state = states.get(board, False)
+            if state.result == CHECKMATE:
                 print_board(board)
                 print("Шах и мат! Вы победили!")
                 break
-            elif board.is_stalemate(False):
+            elif state.result == STALEMATE:
                 print_board(board)
                 print("Пат! Ничья!")
                 break
@@ -94,27 +140,48 @@ def play_game():
             print("\nХод компьютера...")
             start_time = time.time()
             
-            # Ход компьютера
-            score, best_move = negamax(board, depth, float('-inf'), float('inf'), False)
-            if best_move is None:
+            # Ход компьютера: при угаданном ходе игрока берем результат размышления
+            result = ponderer.finish(move, time_limit) if ponderer is not None else None
+            if result is not None:
+                score, best_move, depth = result
+                print("Ваш ход был предсказан")
+            else:
+                score, best_move, depth = ai.get_best_move(board, False, max_depth, time_limit)
+            if best_move is None or score < -MATE_BOUND:
                 print("Компьютер сдается!")
                 break
                 
             board.make_move(best_move)
             elapsed = time.time() - start_time
             print(f"Компьютер сделал ход за {elapsed:.1f} секунд")
+            if ai.move_source == 'book':
+                print("Ход из дебютной книги")
+            elif ai.move_source == 'tablebase':
+                print("Ход из таблиц окончаний")
+            elif time_limit is not None:
+                print(f"Глубина поиска: {depth}")
+            if ai.move_source == 'search' and len(ai.pv) > 1:
+                print(f"Ожидаемое продолжение: {' '.join(format_move(move) for move in ai.pv)}")
             
             if depth >= 4:
                 print(f"Оценка позиции: {score/100:.2f}")
+                print(f"Узлов: {ai.nodes + ai.qnodes} (форсированный поиск: {ai.qnodes})")
+                print(f"Попаданий в хеш-таблицу: {tt.hit_rate():.0%}")
+                print(f"Коэффициент ветвления: {ai.branching_factor():.1f}")
+            if show_stats:
+                print(ai.stats.format())
+            if stats_log is not None:
+                append_log(stats_log, ai.stats)
             
-            if board.is_in_check(True):
+            state = states.get(board, True)
+            if state.in_check:
                 print("Шах!")
             
-            if board.is_checkmate(True):
+            if state.result == CHECKMATE:
                 print_board(board)
                 print("Шах и мат! Компьютер победил!")
                 break
-            elif board.is_stalemate(True):
+            elif state.result == STALEMATE:
                 print_board(board)
                 print("Пат! Ничья!")
                 break
@@ -122,11 +189,26 @@ def play_game():
     except KeyboardInterrupt:
         print("\nИгра прервана")
         return
+    finally:
+        if ponderer is not None:
+            ponderer.stop()
+        if cache is not None:
+            cache.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Консольные шахматы")
+    parser.add_argument('--stats', action='store_true',
+                        help="печатать статистику поиска после каждого хода компьютера")
+    parser.add_argument('--stats-log', default=None,
+                        help="дописывать статистику каждого поиска в файл (строка JSON на ход)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE,
+                        help="файл постоянного кэша анализа (по умолчанию в домашнем каталоге)")
+    parser.add_argument('--no-cache', action='store_true', help="не использовать кэш анализа")
+    args = parser.parse_args(argv)
 
-def main():
     while True:
         try:
-            play_game()
+            play_game(args.stats, args.stats_log, None if args.no_cache else args.cache)
             
             while True:
                 try:
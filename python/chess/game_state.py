@@ -0,0 +1,48 @@
+from board import decode_move, new_move_buffer
+
+# Результат партии в позиции
+CHECKMATE = 'checkmate'
+STALEMATE = 'stalemate'
+
+# Сколько позиций хранить; при переполнении кэш очищается целиком
+MAX_STATES = 4096
+
+
+class GameState:
+    # То, что нужно знать о позиции интерфейсу и корню поиска: легальные
+    # ходы (кодами и кортежами), шах и результат партии
+    def __init__(self, board, is_white):
+        buffer = new_move_buffer()
+        count, self.in_check = board.generate_moves(buffer, is_white)
+        self.is_white = is_white
+        self.codes = buffer[:count]
+        self.moves = [decode_move(code) for code in self.codes]
+        if count:
+            self.result = None
+        else:
+            self.result = CHECKMATE if self.in_check else STALEMATE
+
+    def is_legal(self, move):
+        return move in self.moves
+
+
+class GameStates:
+    # Кэш GameState по ключу Зобриста: между ходами игровой цикл и поиск
+    # (AI(states=...)) обращаются к одной позиции несколько раз, а ходы
+    # генерируются только в первый
+    def __init__(self):
+        self.states = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, board, is_white):
+        key = board.position_key(is_white)
+        state = self.states.get(key)
+        if state is not None:
+            self.hits += 1
+            return state
+        self.misses += 1
+        if len(self.states) >= MAX_STATES:
+            self.states.clear()
+        state = self.states[key] = GameState(board, is_white)
+        return state
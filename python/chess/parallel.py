@@ -0,0 +1,159 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from ai import AI, SearchTimeout, MATE_SCORE, MATE_BOUND, MAX_DEPTH
+from bench import BENCH_POSITIONS
+from bitboard import BitBoard
+from transposition import TranspositionTable
+
+# Состояние процесса-исполнителя: свой AI со своей хеш-таблицей, который
+# живет между задачами, и общая для всех процессов нижняя граница alpha
+_worker_ai = None
+_worker_search_id = None
+_shared_alpha = None
+
+
+def _init_worker(shared_alpha, tt_size_mb, ai_options):
+    global _worker_ai, _shared_alpha
+    _worker_ai = AI(TranspositionTable(tt_size_mb), **ai_options)
+    _shared_alpha = shared_alpha
+
+
+def _search_root_move(task):
+    # Поиск одного корневого хода. Окно сверху открыто, а снизу ограничено
+    # лучшей оценкой, уже найденной любым из процессов. Возвращает
+    # (ход, оценка, точная ли оценка, узлов): оценка не выше alpha - только
+    # верхняя граница; выше alpha - точная, так как окно сверху открыто
+    global _worker_search_id
+    rows, is_white, move, depth, deadline, search_id = task
+    if deadline is not None and time.time() >= deadline:
+        return move, None, False, 0
+    ai = _worker_ai
+    if search_id != _worker_search_id:
+        _worker_search_id = search_id
+        ai.new_search()
+        ai.tt.new_search()
+
+    board = BitBoard.from_rows(rows)
+    board.make_move(move)
+    ai.deadline = deadline
+    ai.node_limit = None
+    ai.limits_enabled = deadline is not None
+    nodes_before = ai.nodes + ai.qnodes
+    alpha = _shared_alpha.value
+    try:
+        value, _ = ai.negamax(board, depth - 1, float('-inf'), -alpha, not is_white, 1)
+    except SearchTimeout:
+        return move, None, False, ai.nodes + ai.qnodes - nodes_before
+    value = -value
+    exact = value > alpha
+    if exact:
+        with _shared_alpha.get_lock():
+            if value > _shared_alpha.value:
+                _shared_alpha.value = value
+    return move, value, exact, ai.nodes + ai.qnodes - nodes_before
+
+
+class ParallelAI:
+    # Параллельный поиск с разделением корневых ходов между процессами.
+    # Лучший ход прошлой итерации считается первым (он задает alpha),
+    # остальные раздаются пулу по одному с общей границей alpha.
+    # ai_options передаются AI в процессах (например, null_move=False).
+    # Интерфейс get_best_move совпадает с AI.get_best_move
+    def __init__(self, workers=None, tt_size_mb=16, **ai_options):
+        self.workers = workers or os.cpu_count() or 1
+        self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+        self.pool = multiprocessing.Pool(self.workers, _init_worker,
+                                         (self.shared_alpha, tt_size_mb, ai_options))
+        self.search_id = 0
+        self.nodes = 0
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_best_move(self, board, is_white, max_depth=MAX_DEPTH, time_limit=None):
+        self.search_id += 1
+        self.nodes = 0
+        deadline = time.time() + time_limit if time_limit is not None else None
+        moves = board.get_legal_moves(is_white)
+        if not moves:
+            return (-MATE_SCORE if board.is_in_check(is_white) else 0), None, 0
+
+        rows = [row[:] for row in board.board]
+        best = (0, None, 0)
+        for depth in range(1, max_depth + 1):
+            # Первую итерацию всегда доводим до конца, чтобы был хотя бы один ход
+            limit = deadline if depth > 1 else None
+            tasks = [(rows, is_white, move, depth, limit, self.search_id) for move in moves]
+            self.shared_alpha.value = float('-inf')
+            results = [self.pool.apply(_search_root_move, (tasks[0],))]
+            results.extend(self.pool.imap_unordered(_search_root_move, tasks[1:], chunksize=1))
+            self.nodes += sum(nodes for _, _, _, nodes in results)
+            if any(value is None for _, value, _, _ in results):
+                break
+
+            # Следующая итерация начинается с лучших ходов этой. Граница
+            # (отсечение снизу) не бывает выше лучшей точной оценки, но может
+            # быть равна ей - тогда ход с точной оценкой идет первым;
+            # при прочих равных сохраняется прежний порядок
+            order = {move: index for index, move in enumerate(moves)}
+            results.sort(key=lambda result: (-result[1], not result[2], order[result[0]]))
+            moves = [move for move, _, _, _ in results]
+            best = (results[0][1], results[0][0], depth)
+            if abs(best[0]) > MATE_BOUND:
+                break
+        return best
+
+
+def compare(workers, depth, positions):
+    # Одни и те же позиции: один процесс против пула
+    single_time = 0.0
+    single_nodes = 0
+    for placement, is_white in positions:
+        ai = AI(TranspositionTable())
+        board = BitBoard.from_placement(placement)
+        start_time = time.perf_counter()
+        ai.get_best_move(board, is_white, max_depth=depth)
+        single_time += time.perf_counter() - start_time
+        single_nodes += ai.nodes + ai.qnodes
+
+    parallel_time = 0.0
+    parallel_nodes = 0
+    with ParallelAI(workers) as parallel_ai:
+        for placement, is_white in positions:
+            board = BitBoard.from_placement(placement)
+            start_time = time.perf_counter()
+            parallel_ai.get_best_move(board, is_white, max_depth=depth)
+            parallel_time += time.perf_counter() - start_time
+            parallel_nodes += parallel_ai.nodes
+
+    print(f"Позиций: {len(positions)}, глубина {depth}")
+    print(f"1 процесс:     {single_time:7.2f} с, {single_nodes} узлов")
+    print(f"{workers} процесс(ов): {parallel_time:7.2f} с, {parallel_nodes} узлов")
+    if parallel_time:
+        print(f"Ускорение:     {single_time / parallel_time:.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение параллельного и однопроцессного поиска")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="число процессов")
+    parser.add_argument('--depth', type=int, default=5, help="глубина поиска")
+    parser.add_argument('--positions', type=int, default=len(BENCH_POSITIONS),
+                        help="сколько позиций из набора bench.py использовать")
+    args = parser.parse_args(argv)
+    compare(args.workers, args.depth, BENCH_POSITIONS[:args.positions])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
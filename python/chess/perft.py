@@ -0,0 +1,192 @@
+import argparse
+import sys
+import time
+
+from board import Board, format_move, new_move_buffer
+from bitboard import BitBoard
+
+BOARDS = {'bitboard': BitBoard, 'mailbox': Board}
+
+# Эталонные позиции: имя -> (строки доски, ход белых, {глубина: число листьев}).
+# Числа посчитаны по правилам этой доски: без рокировки, взятия на проходе
+# и превращения пешки (пешка на последней горизонтали больше не ходит),
+# поэтому для части позиций они отличаются от общеизвестных значений perft.
+REFERENCE_POSITIONS = {
+    'start': ([
+        'rnbqkbnr',
+        'pppppppp',
+        '........',
+        '........',
+        '........',
+        '........',
+        'PPPPPPPP',
+        'RNBQKBNR',
+    ], True, {1: 20, 2: 400, 3: 8902, 4: 197281}),
+    'kiwipete': ([
+        'r...k..r',
+        'p.ppqpb.',
+        'bn..pnp.',
+        '...PN...',
+        '.p..P...',
+        '..N..Q.p',
+        'PPPBBPPP',
+        'R...K..R',
+    ], True, {1: 46, 2: 1865, 3: 86585}),
+    'endgame': ([
+        '........',
+        '..p.....',
+        '...p....',
+        'KP.....r',
+        '.R...p.k',
+        '........',
+        '....P.P.',
+        '........',
+    ], True, {1: 14, 2: 191, 3: 2810, 4: 43087}),
+    'promotion': ([
+        'r...k..r',
+        'Pppp.ppp',
+        '.b...nbn',
+        'nP......',
+        'BBP.P...',
+        'q....N..',
+        'Pp.P..PP',
+        'R..Q.RK.',
+    ], True, {1: 6, 2: 234, 3: 7427}),
+    'middlegame': ([
+        'rnbq.k.r',
+        'pp.Pbppp',
+        '..p.....',
+        '........',
+        '..B.....',
+        '........',
+        'PPP.NnPP',
+        'RNBQK..R',
+    ], True, {1: 40, 2: 1349, 3: 51751}),
+    'open_black': ([
+        'r....rk.',
+        '.pp.qppp',
+        'p.np.n..',
+        '..b.p.B.',
+        '..B.P.b.',
+        'P.NP.N..',
+        '.PP.QPPP',
+        'R....RK.',
+    ], False, {1: 46, 2: 2079, 3: 89890}),
+    'pins': ([
+        '....k...',
+        '........',
+        '........',
+        'q..PK..r',
+        '........',
+        '........',
+        '....b...',
+        '........',
+    ], True, {1: 6, 2: 239, 3: 817, 4: 33681}),
+    'stuck_pawns': ([
+        '....k...',
+        'P......P',
+        '........',
+        '........',
+        '........',
+        '........',
+        'p......p',
+        '....K...',
+    ], True, {1: 7, 2: 49, 3: 380, 4: 2952}),
+}
+
+
+def perft(board, depth, is_white, buffers=None):
+    # Число листьев дерева легальных ходов заданной глубины.
+    # Ходы генерируются кодами в заранее выделенные буферы, по одному на уровень
+    if depth == 0:
+        return 1
+    if buffers is None:
+        buffers = [new_move_buffer() for _ in range(depth)]
+    buffer = buffers[depth - 1]
+    count, _ = board.generate_moves(buffer, is_white)
+    if depth == 1:
+        return count
+    nodes = 0
+    for index in range(count):
+        board.make_move_code(buffer[index])
+        nodes += perft(board, depth - 1, not is_white, buffers)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, depth, is_white):
+    # perft с разбивкой по первому ходу - для поиска расхождений
+    result = {}
+    for move in board.get_legal_moves(is_white):
+        board.make_move(move)
+        result[move] = perft(board, depth - 1, not is_white) if depth > 1 else 1
+        board.unmake_move()
+    return result
+
+
+def run_suite(board_class, max_depth=None):
+    # Прогон всех эталонных позиций; возвращает число расхождений
+    failures = 0
+    total_nodes = 0
+    total_time = 0.0
+    for name, (rows, is_white, expected) in REFERENCE_POSITIONS.items():
+        for depth, count in sorted(expected.items()):
+            if max_depth is not None and depth > max_depth:
+                continue
+            board = board_class.from_rows(rows)
+            start_time = time.perf_counter()
+            nodes = perft(board, depth, is_white)
+            elapsed = time.perf_counter() - start_time
+            total_nodes += nodes
+            total_time += elapsed
+            status = 'OK' if nodes == count else 'ОШИБКА'
+            if nodes != count:
+                failures += 1
+            print(f"{status:6} {name:12} глубина {depth}: {nodes:>8} (ожидалось {count:>8}) {elapsed:7.2f} с")
+    nps = total_nodes / total_time if total_time else 0
+    print(f"{board_class.__name__}: {total_nodes} узлов за {total_time:.2f} с, {nps:.0f} узлов/с, ошибок: {failures}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка и замер скорости генератора ходов (perft)")
+    parser.add_argument('--board', choices=sorted(BOARDS) + ['all'], default='bitboard',
+                        help="реализация доски (по умолчанию bitboard)")
+    parser.add_argument('--position', choices=sorted(REFERENCE_POSITIONS), default='start',
+                        help="эталонная позиция (по умолчанию start)")
+    parser.add_argument('--depth', type=int, default=3, help="глубина perft")
+    parser.add_argument('--divide', action='store_true', help="разбивка по первому ходу")
+    parser.add_argument('--test', action='store_true',
+                        help="прогнать все эталонные позиции и сверить число узлов")
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help="ограничение глубины для --test")
+    args = parser.parse_args(argv)
+
+    board_classes = list(BOARDS.values()) if args.board == 'all' else [BOARDS[args.board]]
+
+    if args.test:
+        failures = sum(run_suite(board_class, args.max_depth) for board_class in board_classes)
+        return 1 if failures else 0
+
+    rows, is_white, expected = REFERENCE_POSITIONS[args.position]
+    for board_class in board_classes:
+        board = board_class.from_rows(rows)
+        start_time = time.perf_counter()
+        if args.divide:
+            counts = divide(board, args.depth, is_white)
+            for move, count in sorted(counts.items(), key=lambda item: format_move(item[0])):
+                print(f"{format_move(move)}: {count}")
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(board, args.depth, is_white)
+        elapsed = time.perf_counter() - start_time
+        nps = nodes / elapsed if elapsed else 0
+        print(f"{board_class.__name__} perft({args.depth}) = {nodes}, {elapsed:.2f} с, {nps:.0f} узлов/с")
+        if args.depth in expected and nodes != expected[args.depth]:
+            print(f"Ожидалось {expected[args.depth]}!")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
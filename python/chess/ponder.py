@@ -0,0 +1,85 @@
+import threading
+import time
+
+from ai import MAX_DEPTH
+from board import decode_move
+
+# Глубина поиска, которым угадывается ход соперника, если его нет в хеш-таблице
+GUESS_DEPTH = 3
+
+
+class Ponderer:
+    # Размышление на времени соперника: пока человек думает над ходом,
+    # фоновый поток ищет ответ на его ожидаемый ход. Поиск идет тем же
+    # объектом AI (общая хеш-таблица, убийцы, история), поэтому главный
+    # поток обращается к AI только после остановки потока
+    def __init__(self, ai):
+        self.ai = ai
+        self.thread = None
+        self.expected_move = None
+        self.result = None
+        self.start_time = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, board, is_white, max_depth=MAX_DEPTH):
+        # board - позиция, в которой ходит соперник (is_white - его цвет)
+        self.stop()
+        self.expected_move = None
+        self.result = None
+        self.thread = threading.Thread(target=self._run, args=(board.copy(), is_white, max_depth),
+                                       daemon=True)
+        self.thread.start()
+
+    def _guess(self, board, is_white):
+        # Ожидаемый ход соперника: второй ход основного варианта нашего
+        # последнего поиска, лучший ход из хеш-таблицы или короткий поиск
+        ai = self.ai
+        legal = board.get_legal_moves(is_white)
+        if (len(ai.pv) > 1 and board.undo_stack and
+                ai.pv[0] == decode_move(board.undo_stack[-1][0]) and ai.pv[1] in legal):
+            return ai.pv[1]
+        if ai.tt is not None:
+            entry = ai.tt.probe(board.position_key(is_white))
+            if entry is not None and decode_move(entry[3]) in legal:
+                return decode_move(entry[3])
+        _, move, _ = ai.get_best_move(board, is_white, GUESS_DEPTH)
+        return move
+
+    def _run(self, board, is_white, max_depth):
+        move = self._guess(board, is_white)
+        if move is None or self.ai.stop_requested:
+            return
+        board.make_move(move)
+        self.start_time = time.time()
+        self.expected_move = move
+        self.result = self.ai.get_best_move(board, not is_white, max_depth)
+
+    def stop(self):
+        # Отмена поиска: флаг проверяется в узлах поиска, поток завершается
+        # с результатом последней законченной итерации
+        if self.thread is None:
+            return
+        self.ai.stop_requested = True
+        self.thread.join()
+        self.ai.stop_requested = False
+        self.thread = None
+
+    def finish(self, move, time_limit=None):
+        # Соперник сделал ход move. При совпадении с ожидаемым ходом
+        # дожидаемся поиска (не дольше, чем осталось от time_limit с начала
+        # размышления) и возвращаем его результат (оценка, ход, глубина);
+        # при промахе поиск отменяется и возвращается None
+        if self.thread is None:
+            return None
+        if move != self.expected_move:
+            self.stop()
+            self.misses += 1
+            return None
+        remaining = None
+        if time_limit is not None:
+            remaining = max(0.0, self.start_time + time_limit - time.time())
+        self.thread.join(remaining)
+        self.stop()
+        self.hits += 1
+        return self.result
@@ -0,0 +1,113 @@
+import json
+
+from board import format_move
+
+# Названия стадий ленивой генерации ходов (ai.STAGE_NAMES) для вывода
+STAGE_TITLES = {'hash': 'ход из хеша', 'captures': 'взятия', 'killers': 'убийцы', 'quiets': 'тихие ходы'}
+
+
+class SearchStats:
+    # Статистика одного поиска (хода компьютера). Заполняется в
+    # AI.get_best_move по счетчикам поиска; to_dict дает запись для журнала
+    def __init__(self, fen=None):
+        self.fen = fen
+        self.source = None
+        self.move = None
+        self.score = 0
+        self.depth = 0
+        self.elapsed = 0.0
+        self.nodes = 0
+        self.qnodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.cache_probes = 0
+        self.cache_hits = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_move_cutoffs = 0
+        # Ленивая генерация: число узлов с генерацией по стадиям и для каждой
+        # стадии {'entered': в скольких узлах до нее дошли, 'moves': ходов,
+        # 'cutoffs': отсечений}
+        self.staged_nodes = 0
+        self.stages = {}
+        # Завершенные итерации углубления: глубина, оценка, узлы,
+        # время с начала поиска, основной вариант
+        self.iterations = []
+        self.pv = []
+
+    def add_iteration(self, depth, score, nodes, elapsed, pv):
+        self.iterations.append({
+            'depth': depth,
+            'score': score,
+            'nodes': nodes,
+            'time': round(elapsed, 4),
+            'pv': [format_move(move) for move in pv],
+        })
+
+    def nps(self):
+        return (self.nodes + self.qnodes) / self.elapsed if self.elapsed else 0.0
+
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def cache_hit_rate(self):
+        return self.cache_hits / self.cache_probes if self.cache_probes else 0.0
+
+    def first_move_cutoff_rate(self):
+        # Доля отсечений первым же ходом - мера качества упорядочивания
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def to_dict(self):
+        return {
+            'fen': self.fen,
+            'source': self.source,
+            'move': format_move(self.move) if self.move is not None else None,
+            'score': self.score,
+            'depth': self.depth,
+            'time': round(self.elapsed, 4),
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'nps': round(self.nps()),
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': round(self.tt_hit_rate(), 4),
+            'cache_probes': self.cache_probes,
+            'cache_hits': self.cache_hits,
+            'cutoffs': self.cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': round(self.first_move_cutoff_rate(), 4),
+            'null_move_cutoffs': self.null_move_cutoffs,
+            'staged_nodes': self.staged_nodes,
+            'stages': self.stages,
+            'iterations': self.iterations,
+            'pv': [format_move(move) for move in self.pv],
+        }
+
+    def format(self):
+        lines = [
+            f"Статистика поиска: глубина {self.depth}, время {self.elapsed:.2f} с",
+            f"  Узлов: {self.nodes + self.qnodes} (форсированный поиск: {self.qnodes}), "
+            f"{self.nps():.0f} узлов/с",
+            f"  Хеш-таблица: {self.tt_probes} обращений, {self.tt_hit_rate():.0%} попаданий",
+            f"  Отсечений: {self.cutoffs}, первым ходом: {self.first_move_cutoff_rate():.0%}, "
+            f"нулевым ходом: {self.null_move_cutoffs}",
+        ]
+        if self.cache_probes:
+            lines.append(f"  Кэш анализа: {self.cache_probes} обращений, "
+                         f"{self.cache_hit_rate():.0%} попаданий")
+        if self.staged_nodes:
+            lines.append(f"  Генерация ходов по стадиям ({self.staged_nodes} узлов):")
+            for name, stage in self.stages.items():
+                lines.append(f"    {STAGE_TITLES[name]:12} {stage['entered'] / self.staged_nodes:4.0%} узлов, "
+                             f"ходов: {stage['moves']}, отсечений: {stage['cutoffs']}")
+        for iteration in self.iterations:
+            lines.append(f"  Глубина {iteration['depth']:2}: {iteration['time']:7.2f} с, "
+                         f"{iteration['nodes']:>8} узлов, оценка {iteration['score']}, "
+                         f"{' '.join(iteration['pv'])}")
+        return '\n'.join(lines)
+
+
+def append_log(path, stats):
+    # Журнал: одна строка JSON на поиск
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(stats.to_dict(), ensure_ascii=False) + '\n')
@@ -0,0 +1,257 @@
+import argparse
+import mmap
+import os
+import sys
+from array import array
+
+from bitboard import (KNIGHT_ATTACKS, KING_ATTACKS, WHITE_PAWN_ATTACKS,
+                      ROOK_RAYS, BISHOP_RAYS, slider_attacks, iter_squares)
+
+# Таблицы окончаний "король и фигура против короля", построенные
+# ретроградным анализом. Позиция индексируется как
+# ((король сильной стороны * 64 + фигура) * 64 + король слабой стороны) * 2 + очередь,
+# очередь 0 - ходит сильная сторона. Значение - байт со знаком:
+#   0      ничья (или невозможная позиция)
+#   n > 0  ходящий выигрывает, мат через n - 1 полуходов
+#   n < 0  ходящий проигрывает, мат через -n - 1 полуходов
+# Превращения пешки в программе нет, поэтому KPK - всегда ничья,
+# но таблица все равно избавляет поиск от бесполезного перебора.
+MAGIC = b'CHESSTB1'
+HEADER_SIZE = 16
+SIZE = 64 * 64 * 64 * 2
+MATERIALS = ['KQK', 'KRK', 'KPK']
+
+DRAW = 0
+WIN = 1
+LOSS = -1
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tablebases')
+
+# Счетчик для позиций, которые слабая сторона не может проиграть
+# (у нее есть взятие незащищенной фигуры)
+NEVER = 255
+
+
+def _index(strong_king, piece_sq, weak_king, weak_to_move):
+    return ((strong_king * 64 + piece_sq) * 64 + weak_king) * 2 + weak_to_move
+
+
+def _piece_attacks(kind, sq, occupied):
+    if kind == 'Q':
+        return slider_attacks(sq, occupied, ROOK_RAYS) | slider_attacks(sq, occupied, BISHOP_RAYS)
+    if kind == 'R':
+        return slider_attacks(sq, occupied, ROOK_RAYS)
+    if kind == 'B':
+        return slider_attacks(sq, occupied, BISHOP_RAYS)
+    if kind == 'N':
+        return KNIGHT_ATTACKS[sq]
+    return WHITE_PAWN_ATTACKS[sq]
+
+
+def _piece_unmoves(kind, sq, occupied):
+    # Клетки, с которых фигура могла прийти на sq тихим ходом
+    if kind == 'P':
+        result = 0
+        prev = sq + 8
+        if prev < 56 and not occupied >> prev & 1:
+            result |= 1 << prev
+            if sq >> 3 == 4 and not occupied >> (prev + 8) & 1:
+                result |= 1 << (prev + 8)
+        return result
+    return _piece_attacks(kind, sq, occupied) & ~occupied
+
+
+def generate(material):
+    # Ретроградный анализ: от матов назад по слоям полуходов. Сильная
+    # сторона выигрывает, если есть ход в проигранную для соперника позицию;
+    # слабая проигрывает, когда все ее ходы ведут в выигрыш сильной
+    kind = material[1]
+    values = array('b', bytes(SIZE))
+    counters = array('B', bytes(SIZE))
+
+    def valid(strong_king, piece_sq, weak_king, weak_to_move):
+        if len({strong_king, piece_sq, weak_king}) < 3:
+            return False
+        if kind == 'P' and piece_sq >= 56:
+            return False
+        if KING_ATTACKS[strong_king] >> weak_king & 1:
+            return False
+        if not weak_to_move:
+            # Ходит сильная сторона - король соперника не может быть под шахом
+            occupied = 1 << strong_king | 1 << piece_sq | 1 << weak_king
+            if _piece_attacks(kind, piece_sq, occupied) >> weak_king & 1:
+                return False
+        return True
+
+    # Ходы слабой стороны в каждой позиции и маты
+    frontier = []
+    for strong_king in range(64):
+        for piece_sq in range(64):
+            for weak_king in range(64):
+                if not valid(strong_king, piece_sq, weak_king, 1):
+                    continue
+                index = _index(strong_king, piece_sq, weak_king, 1)
+                occupied = 1 << strong_king | 1 << piece_sq
+                guarded = KING_ATTACKS[strong_king] | _piece_attacks(kind, piece_sq, occupied)
+                in_check = guarded >> weak_king & 1 and not KING_ATTACKS[strong_king] >> weak_king & 1
+                targets = KING_ATTACKS[weak_king] & ~guarded & ~(1 << strong_king)
+                if KING_ATTACKS[weak_king] >> piece_sq & 1 and not KING_ATTACKS[strong_king] >> piece_sq & 1:
+                    counters[index] = NEVER
+                    continue
+                count = bin(targets).count('1')
+                if count:
+                    counters[index] = count
+                elif in_check:
+                    values[index] = -1
+                    frontier.append((strong_king, piece_sq, weak_king))
+
+    plies = 0
+    while frontier:
+        # Позиции в frontier проигрываются ходящей слабой стороной через plies полуходов
+        won = []
+        for strong_king, piece_sq, weak_king in frontier:
+            occupied = 1 << strong_king | 1 << piece_sq | 1 << weak_king
+            for prev in iter_squares(KING_ATTACKS[strong_king] & ~occupied):
+                won.append((prev, piece_sq, weak_king))
+            for prev in iter_squares(_piece_unmoves(kind, piece_sq, occupied)):
+                won.append((strong_king, prev, weak_king))
+        next_frontier = []
+        for strong_king, piece_sq, weak_king in won:
+            index = _index(strong_king, piece_sq, weak_king, 0)
+            if values[index] or not valid(strong_king, piece_sq, weak_king, 0):
+                continue
+            values[index] = plies + 2
+            occupied = 1 << strong_king | 1 << piece_sq | 1 << weak_king
+            for prev in iter_squares(KING_ATTACKS[weak_king] & ~occupied):
+                prev_index = _index(strong_king, piece_sq, prev, 1)
+                if counters[prev_index] in (0, NEVER) or values[prev_index]:
+                    continue
+                if not valid(strong_king, piece_sq, prev, 1):
+                    continue
+                counters[prev_index] -= 1
+                if counters[prev_index] == 0:
+                    values[prev_index] = -(plies + 3)
+                    next_frontier.append((strong_king, piece_sq, prev))
+        frontier = next_frontier
+        plies += 2
+    return values
+
+
+def write_table(material, values, path):
+    with open(path, 'wb') as f:
+        f.write(MAGIC + material.encode().ljust(HEADER_SIZE - len(MAGIC), b'\0'))
+        f.write(values.tobytes())
+
+
+class Tablebases:
+    # Открывает все найденные в каталоге таблицы через mmap; зондирование -
+    # чтение одного байта по индексу, без загрузки файла в память
+    def __init__(self, directory=DEFAULT_DIR):
+        self.tables = {}
+        self.files = []
+        self.hits = 0
+        if not os.path.isdir(directory):
+            return
+        for material in MATERIALS:
+            path = os.path.join(directory, material + '.tb')
+            if not os.path.exists(path):
+                continue
+            f = open(path, 'rb')
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if data[:len(MAGIC)] != MAGIC or len(data) != HEADER_SIZE + SIZE:
+                data.close()
+                f.close()
+                continue
+            self.files.append(f)
+            self.tables[material[1]] = data
+
+    def close(self):
+        for data in self.tables.values():
+            data.close()
+        for f in self.files:
+            f.close()
+        self.tables = {}
+        self.files = []
+
+    def __bool__(self):
+        return bool(self.tables)
+
+    def probe(self, board, is_white):
+        # (результат для ходящей стороны: WIN/DRAW/LOSS, полуходов до мата) или None
+        if board.piece_count > 3:
+            return None
+        kings = {}
+        extra = []
+        for i in range(8):
+            for j in range(8):
+                piece = board.board[i][j]
+                if piece in 'Kk':
+                    kings[piece] = i * 8 + j
+                elif piece != '.':
+                    extra.append((piece, i * 8 + j))
+        if len(kings) != 2:
+            return None
+        if not extra:
+            return DRAW, 0
+        piece, piece_sq = extra[0]
+        data = self.tables.get(piece.upper())
+        if data is None:
+            return None
+
+        if piece.isupper():
+            strong_king, weak_king, weak_to_move = kings['K'], kings['k'], not is_white
+        else:
+            # Фигура у черных: отражаем доску по вертикали и меняем цвета
+            strong_king, weak_king, weak_to_move = kings['k'] ^ 56, kings['K'] ^ 56, is_white
+            piece_sq ^= 56
+        value = data[HEADER_SIZE + _index(strong_king, piece_sq, weak_king, int(weak_to_move))]
+        if value > 127:
+            value -= 256
+        self.hits += 1
+        if value == 0:
+            return DRAW, 0
+        if value > 0:
+            return WIN, value - 1
+        return LOSS, -value - 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Таблицы окончаний")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('generate', help="построить таблицы")
+    build.add_argument('materials', nargs='*', default=MATERIALS,
+                       help="наборы материала (по умолчанию все: KQK KRK KPK)")
+    build.add_argument('--dir', default=DEFAULT_DIR, help="каталог для таблиц")
+    probe = commands.add_parser('probe', help="результат для позиции")
+    probe.add_argument('placement', help="расстановка в нотации FEN")
+    probe.add_argument('side', choices=['w', 'b'], help="чей ход")
+    probe.add_argument('--dir', default=DEFAULT_DIR, help="каталог с таблицами")
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        os.makedirs(args.dir, exist_ok=True)
+        for material in args.materials:
+            if material not in MATERIALS:
+                print(f"Неизвестный набор материала: {material}")
+                return 1
+            values = generate(material)
+            write_table(material, values, os.path.join(args.dir, material + '.tb'))
+            longest = max(abs(value) for value in values) - 1
+            print(f"{material}: самый длинный мат - {max(longest, 0)} полуходов")
+        return 0
+
+    from board import Board
+    tablebases = Tablebases(args.dir)
+    result = tablebases.probe(Board.from_placement(args.placement), args.side == 'w')
+    tablebases.close()
+    if result is None:
+        print("Позиции нет в таблицах")
+    else:
+        outcome, plies = result
+        names = {WIN: "выигрыш", DRAW: "ничья", LOSS: "проигрыш"}
+        print(f"{names[outcome]}" + (f", мат через {plies} полуходов" if outcome != DRAW else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
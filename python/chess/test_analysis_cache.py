@@ -0,0 +1,28 @@
+import pytest
+
+from analysis_cache import AnalysisCache
+
+
+def test_store_and_probe_across_sessions(tmp_path):
+    path = str(tmp_path / 'cache.bin')
+    with AnalysisCache(path, size_mb=1) as cache:
+        cache.store(12345, 5, -40, 0, 77)
+    with AnalysisCache(path, size_mb=1) as cache:
+        assert cache.probe(12345) == (5, -40, 0, 77)
+    assert [p.name for p in tmp_path.iterdir()] == ['cache.bin']
+
+
+def test_short_file_is_not_a_cache(tmp_path):
+    # Файл короче заголовка - например, после прерванной записи
+    path = tmp_path / 'cache.bin'
+    path.write_bytes(b'CHESS')
+    with pytest.raises(ValueError):
+        AnalysisCache(str(path))
+
+
+def test_empty_file_is_replaced(tmp_path):
+    path = tmp_path / 'cache.bin'
+    path.write_bytes(b'')
+    with AnalysisCache(str(path), size_mb=1) as cache:
+        assert cache.probe(1) is None
+    assert path.stat().st_size > 0
@@ -0,0 +1,39 @@
+import pytest
+
+from ai import AI
+from bench import BENCH_POSITIONS
+from bitboard import BitBoard
+from parallel import ParallelAI
+from transposition import TranspositionTable
+
+# Без нулевого хода и LMR оценка не зависит от окна, поэтому пул обязан
+# получить ту же оценку, что и один процесс (ход при равных оценках может
+# отличаться)
+AI_OPTIONS = {'null_move': False, 'lmr': False}
+POSITIONS = [BENCH_POSITIONS[index] for index in (0, 2, 5, 14, 17, 20)]
+
+
+@pytest.fixture(scope='module', params=[1, 2])
+def parallel_ai(request):
+    with ParallelAI(request.param, **AI_OPTIONS) as parallel_ai:
+        yield parallel_ai
+
+
+@pytest.mark.parametrize('placement, is_white', POSITIONS)
+@pytest.mark.parametrize('depth', [2, 3])
+def test_parallel_matches_single_process(parallel_ai, placement, is_white, depth):
+    ai = AI(TranspositionTable(), **AI_OPTIONS)
+    expected, _, _ = ai.get_best_move(BitBoard.from_placement(placement), is_white,
+                                      max_depth=depth)
+    score, move, reached = parallel_ai.get_best_move(BitBoard.from_placement(placement),
+                                                     is_white, max_depth=depth)
+    assert (score, reached) == (expected, depth)
+    assert move in BitBoard.from_placement(placement).get_legal_moves(is_white)
+
+
+def test_parallel_prefers_exact_score():
+    # Раньше ход с границей 1 выбирался вместо d1d8 с точной оценкой 100
+    board = BitBoard.from_placement('8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4')
+    with ParallelAI(1) as parallel_ai:
+        score, move, _ = parallel_ai.get_best_move(board, True, max_depth=2)
+    assert (score, move) == (100, ((7, 3), (0, 3)))
@@ -0,0 +1,67 @@
+import pytest
+
+from ai import AI
+from bench import BENCH_POSITIONS
+from bitboard import BitBoard
+from board import parse_move
+from transposition import TranspositionTable
+
+INF = float('inf')
+
+# Сдвиги окна относительно точной оценки: нулевое окно вокруг нее
+# и окна, целиком лежащие выше и ниже
+WINDOW_OFFSETS = [-300, -100, -1, 0, 1, 100, 300]
+
+
+def quiesce_positions():
+    # Позиции замера и позиция, где дельта-отсечение давало ложное отсечение
+    positions = [(BitBoard.from_placement(placement), is_white)
+                 for placement, is_white in BENCH_POSITIONS]
+    board = BitBoard.from_placement('8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4')
+    board.make_move(parse_move('d1d8'))
+    positions.append((board, False))
+    return positions
+
+
+def check_bound(value, alpha, beta, exact):
+    # Оценка fail-soft: ниже окна - верхняя граница, выше - нижняя,
+    # внутри окна - точное значение
+    if value <= alpha:
+        assert exact <= value
+    elif value >= beta:
+        assert exact >= value
+    else:
+        assert value == exact
+
+
+@pytest.mark.parametrize('board, is_white', quiesce_positions())
+def test_quiesce_consistent_across_windows(board, is_white):
+    exact = AI(None).quiesce(board, -INF, INF, is_white, 0)
+    for offset in WINDOW_OFFSETS:
+        alpha = exact + offset
+        for beta in (alpha + 1, alpha + 50):
+            value = AI(None).quiesce(board, alpha, beta, is_white, 0)
+            check_bound(value, alpha, beta, exact)
+
+
+@pytest.mark.parametrize('placement, is_white',
+                         [BENCH_POSITIONS[index] for index in (0, 2, 5, 12, 14, 17, 20)])
+@pytest.mark.parametrize('depth', [2, 3, 4])
+def test_pvs_matches_full_window(placement, is_white, depth):
+    # Без нулевого хода и LMR PVS меняет только число узлов, но не результат;
+    # взятия при этом проверяются, так как неверные границы форсированного
+    # поиска проявлялись только в нулевом окне
+    results = []
+    for pvs in (True, False):
+        ai = AI(TranspositionTable(), null_move=False, lmr=False, pvs=pvs)
+        results.append(ai.get_best_move(BitBoard.from_placement(placement), is_white,
+                                        max_depth=depth))
+    assert results[0] == results[1]
+
+
+def test_narrow_window_after_delta_pruning():
+    board = BitBoard.from_placement('8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4')
+    board.make_move(parse_move('d1d8'))
+    value, _ = AI(None).negamax(board, 1, -INF, -1, False, 1)
+    assert value <= -1
+    assert AI(None).negamax(board, 1, -INF, INF, False, 1)[0] == -100
@@ -0,0 +1,36 @@
+import pytest
+
+from bitboard import BitBoard
+from board import new_move_buffer
+from tournament import random_openings, read_openings
+
+
+def test_random_openings_skip_finished_games():
+    # При этом зерне часть случайных линий заканчивается матом или патом
+    # раньше 12 полуходов
+    openings = random_openings(500, plies=12, seed=3)
+    assert len(openings) == len(set(openings)) == 500
+    buffer = new_move_buffer()
+    for fen in openings:
+        board, is_white = BitBoard.from_fen(fen)
+        assert board.generate_moves(buffer, is_white)[0]
+
+
+def test_read_openings(tmp_path):
+    path = tmp_path / 'openings.epd'
+    path.write_text('# дебюты\n'
+                    'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b - - id "e4";\n'
+                    '\n'
+                    'rnbqkbnr/pppppppp/8/8/8/5N2/PPPPPPPP/RNBQKB1R b - - 1 1\n', encoding='utf-8')
+    assert read_openings(str(path)) == [
+        'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b - -',
+        'rnbqkbnr/pppppppp/8/8/8/5N2/PPPPPPPP/RNBQKB1R b - -',
+    ]
+
+
+def test_read_openings_reports_bad_line(tmp_path):
+    path = tmp_path / 'openings.epd'
+    path.write_text('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - -\n'
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN w - -\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='строка 2'):
+        read_openings(str(path))
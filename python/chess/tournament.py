@@ -0,0 +1,390 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from ai import AI
+from analyze import parse_epd
+from bitboard import BitBoard
+from board import new_move_buffer
+from tablebase import Tablebases
+from transposition import TranspositionTable
+
+# Настройки движка: depth и time ограничивают поиск хода, hash - размер
+# хеш-таблицы в МБ, tb - таблицы окончаний, остальное - параметры AI
+ENGINE_DEFAULTS = {
+    'depth': 3,
+    'time': None,
+    'hash': 16,
+    'tb': False,
+    'ordering': True,
+    'quiescence': True,
+    'null_move': True,
+    'lmr': True,
+    'pvs': True,
+    'aspiration': True,
+    'batch_leaves': True,
+}
+AI_OPTIONS = ['ordering', 'quiescence', 'null_move', 'lmr', 'pvs', 'aspiration', 'batch_leaves']
+
+# Ничья присуждается после стольких полуходов: правила 50 ходов в игре нет,
+# а без превращения пешки окончание может не закончиться никогда
+MAX_PLIES = 200
+# Случайных полуходов от начальной позиции в дебюте
+OPENING_PLIES = 4
+
+# Границы SPRT по умолчанию: H0 - второй движок не сильнее (0 Эло),
+# H1 - сильнее на 10 Эло; ошибки первого и второго рода по 5%
+SPRT_ELO0 = 0.0
+SPRT_ELO1 = 10.0
+SPRT_ALPHA = 0.05
+SPRT_BETA = 0.05
+
+
+def parse_engine(text):
+    # 'depth=4,lmr=0,time=0.1' -> словарь настроек
+    config = dict(ENGINE_DEFAULTS)
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        value = value.strip().lower()
+        if name not in config:
+            raise ValueError(f"Неизвестная настройка движка: {name}")
+        if name == 'time':
+            config[name] = float(value) if value not in ('', 'none') else None
+        elif name in ('depth', 'hash'):
+            config[name] = int(value)
+        elif value in ('1', 'on', 'yes', 'true'):
+            config[name] = True
+        elif value in ('0', 'off', 'no', 'false'):
+            config[name] = False
+        else:
+            raise ValueError(f"Неверное значение {name}: {value}")
+    return config
+
+
+def describe_engine(config):
+    # Ограничение поиска и отличия остальных настроек от значений по умолчанию
+    changes = [f"depth={config['depth']}"]
+    changes.extend(f"{name}={value}" for name, value in config.items()
+                   if name != 'depth' and value != ENGINE_DEFAULTS[name])
+    return ', '.join(changes)
+
+
+def random_openings(count, plies=OPENING_PLIES, seed=None):
+    # Дебюты - случайные легальные ходы от начальной позиции; позиции
+    # с уже законченной партией (в том числе раньше plies полуходов)
+    # и повторы отбрасываются
+    rng = random.Random(seed)
+    buffer = new_move_buffer()
+    openings = []
+    seen = set()
+    attempts = 0
+    while len(openings) < count and attempts < count * 100:
+        attempts += 1
+        board = BitBoard()
+        is_white = True
+        for _ in range(plies):
+            moves, _ = board.generate_legal_moves(is_white)
+            if not moves:
+                break
+            board.make_move(rng.choice(moves))
+            is_white = not is_white
+        fen = board.to_fen(is_white)
+        if fen in seen or not board.generate_moves(buffer, is_white)[0]:
+            continue
+        seen.add(fen)
+        openings.append(fen)
+    return openings
+
+
+def read_openings(path):
+    # Позиции EPD/FEN из файла. Каждая проверяется сразу: ошибка в партии
+    # внутри пула прервала бы весь турнир
+    openings = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip() or line.startswith('#'):
+                continue
+            fen, _ = parse_epd(line)
+            try:
+                BitBoard.from_fen(fen)
+            except ValueError as error:
+                raise ValueError(f"{path}, строка {line_number}: {error}")
+            openings.append(fen)
+    if not openings:
+        raise ValueError(f"{path}: нет позиций")
+    return openings
+
+
+def play_game(task):
+    # Одна партия в процессе пула. Результат - с точки зрения первого
+    # движка: 1, 0.5 или 0; плюс время, ходы и узлы каждой стороны
+    index, fen, configs, first_is_white, max_plies = task
+    board, is_white = BitBoard.from_fen(fen)
+    tablebases = Tablebases() if any(config['tb'] for config in configs) else None
+    engines = []
+    for config in configs:
+        options = {name: config[name] for name in AI_OPTIONS}
+        tablebase = tablebases if config['tb'] else None
+        engines.append(AI(TranspositionTable(config['hash']), tablebase=tablebase, **options))
+    sides = [{'moves': 0, 'time': 0.0, 'nodes': 0} for _ in configs]
+    buffer = new_move_buffer()
+    repetitions = {}
+    plies = 0
+    while True:
+        key = board.position_key(is_white)
+        repetitions[key] = repetitions.get(key, 0) + 1
+        count, in_check = board.generate_moves(buffer, is_white)
+        if not count:
+            winner_is_white = not is_white if in_check else None
+            reason = 'мат' if in_check else 'пат'
+            break
+        if repetitions[key] >= 3:
+            winner_is_white, reason = None, 'троекратное повторение'
+            break
+        if board.piece_count == 2:
+            winner_is_white, reason = None, 'только короли'
+            break
+        if plies >= max_plies:
+            winner_is_white, reason = None, f'{max_plies} полуходов'
+            break
+
+        side = 0 if is_white == first_is_white else 1
+        config = configs[side]
+        ai = engines[side]
+        start_time = time.perf_counter()
+        _, move, _ = ai.get_best_move(board, is_white, config['depth'], config['time'])
+        sides[side]['time'] += time.perf_counter() - start_time
+        sides[side]['moves'] += 1
+        sides[side]['nodes'] += ai.nodes + ai.qnodes
+        board.make_move(move)
+        is_white = not is_white
+        plies += 1
+
+    if tablebases is not None:
+        tablebases.close()
+    if winner_is_white is None:
+        score = 0.5
+    else:
+        score = 1.0 if winner_is_white == first_is_white else 0.0
+    return {
+        'index': index,
+        'fen': fen,
+        'first_is_white': first_is_white,
+        'score': score,
+        'reason': reason,
+        'plies': plies,
+        'sides': sides,
+    }
+
+
+def elo_from_score(score):
+    if score <= 0:
+        return float('-inf')
+    if score >= 1:
+        return float('inf')
+    return 400 * math.log10(score / (1 - score))
+
+
+def elo_estimate(wins, draws, losses):
+    # (Эло, нижняя, верхняя граница 95% интервала) движка относительно
+    # соперника по нормальному приближению
+    games = wins + draws + losses
+    if not games:
+        return 0.0, float('-inf'), float('inf')
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 +
+                losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo_from_score(score), elo_from_score(score - margin), elo_from_score(score + margin)
+
+
+def sprt(wins, draws, losses, elo0=SPRT_ELO0, elo1=SPRT_ELO1, alpha=SPRT_ALPHA, beta=SPRT_BETA):
+    # Последовательный тест отношения правдоподобия для гипотез
+    # "движок сильнее соперника на elo0" (H0) и "на elo1" (H1), нормальное
+    # приближение. Возвращает (LLR, нижняя граница, верхняя граница, решение):
+    # 'H1' - принять H1, 'H0' - принять H0, None - нужны еще партии
+    lower = math.log(beta / (1 - alpha))
+    upper = math.log((1 - beta) / alpha)
+    games = wins + draws + losses
+    if not games:
+        return 0.0, lower, upper, None
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 +
+                losses * score ** 2) / games
+    if variance == 0:
+        return 0.0, lower, upper, None
+    score0 = 1 / (1 + 10 ** (-elo0 / 400))
+    score1 = 1 / (1 + 10 ** (-elo1 / 400))
+    llr = games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+    decision = 'H1' if llr >= upper else 'H0' if llr <= lower else None
+    return llr, lower, upper, decision
+
+
+class Tournament:
+    # Сводка результатов, обновляется по мере завершения партий. Победы,
+    # ничьи, поражения и Эло - второго (нового) движка против первого
+    def __init__(self, configs, sprt_bounds=None):
+        self.configs = configs
+        self.sprt_bounds = sprt_bounds
+        self.wins = self.draws = self.losses = 0
+        self.sides = [{'moves': 0, 'time': 0.0, 'nodes': 0} for _ in configs]
+        self.reasons = {}
+
+    def add(self, result):
+        if result['score'] == 0:
+            self.wins += 1
+        elif result['score'] == 1:
+            self.losses += 1
+        else:
+            self.draws += 1
+        self.reasons[result['reason']] = self.reasons.get(result['reason'], 0) + 1
+        for total, side in zip(self.sides, result['sides']):
+            for name in total:
+                total[name] += side[name]
+
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def sprt(self):
+        if self.sprt_bounds is None:
+            return None
+        return sprt(self.wins, self.draws, self.losses, *self.sprt_bounds)
+
+    def summary(self):
+        elo, low, high = elo_estimate(self.wins, self.draws, self.losses)
+        engines = []
+        for config, side in zip(self.configs, self.sides):
+            engines.append({
+                'config': config,
+                'moves': side['moves'],
+                'time_per_move': side['time'] / side['moves'] if side['moves'] else 0.0,
+                'nps': round(side['nodes'] / side['time']) if side['time'] else 0,
+            })
+        result = {
+            'games': self.games(),
+            'wins': self.wins,
+            'draws': self.draws,
+            'losses': self.losses,
+            # При 100% или 0% очков Эло бесконечно - в JSON это null
+            'elo': elo if math.isfinite(elo) else None,
+            'elo_low': low if math.isfinite(low) else None,
+            'elo_high': high if math.isfinite(high) else None,
+            'reasons': self.reasons,
+            'engines': engines,
+        }
+        test = self.sprt()
+        if test is not None:
+            llr, lower, upper, decision = test
+            result['sprt'] = {'llr': llr, 'lower': lower, 'upper': upper, 'decision': decision,
+                              'elo0': self.sprt_bounds[0], 'elo1': self.sprt_bounds[1]}
+        return result
+
+    def format(self):
+        summary = self.summary()
+        games = summary['games']
+        score = (self.wins + self.draws / 2) / games if games else 0.0
+        elo, low, high = elo_estimate(self.wins, self.draws, self.losses)
+        lines = [
+            f"Партий: {games}. Движок 2: +{self.wins} ={self.draws} -{self.losses}, "
+            f"очков {score:.1%}",
+            f"Эло движка 2 относительно движка 1: {elo:+.1f} (95%: {low:+.1f} .. {high:+.1f})",
+        ]
+        if 'sprt' in summary:
+            test = summary['sprt']
+            decision = {'H1': "движок 2 сильнее - принять",
+                        'H0': "движок 2 не сильнее - отклонить",
+                        None: "нужно больше партий"}[test['decision']]
+            lines.append(f"SPRT [{test['elo0']:+g}, {test['elo1']:+g}]: LLR {test['llr']:.2f} "
+                         f"({test['lower']:.2f} .. {test['upper']:.2f}) - {decision}")
+        for number, engine in enumerate(summary['engines'], 1):
+            lines.append(f"Движок {number} ({describe_engine(engine['config'])}): "
+                         f"{engine['moves']} ходов, {engine['time_per_move']:.3f} с на ход, "
+                         f"{engine['nps']} узлов/с")
+        lines.append("Окончания партий: " + ', '.join(
+            f"{reason} - {count}" for reason, count in sorted(self.reasons.items())))
+        return '\n'.join(lines)
+
+
+def run_tournament(configs, openings, workers=None, max_plies=MAX_PLIES,
+                   sprt_bounds=None, log=sys.stderr):
+    # Каждый дебют играется дважды, со сменой цвета. Партии раздаются пулу;
+    # если задан SPRT, турнир останавливается, как только тест принял решение
+    workers = workers or os.cpu_count() or 1
+    tasks = []
+    for index, fen in enumerate(openings):
+        tasks.append((2 * index, fen, configs, True, max_plies))
+        tasks.append((2 * index + 1, fen, configs, False, max_plies))
+    tournament = Tournament(configs, sprt_bounds)
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap_unordered(play_game, tasks):
+            tournament.add(result)
+            score = {1.0: '1-0', 0.5: '1/2', 0.0: '0-1'}[result['score']]
+            color = "белыми" if result['first_is_white'] else "черными"
+            print(f"Партия {result['index'] + 1:4} (движок 1 {color}): {score}, "
+                  f"{result['reason']}, {result['plies']} полуходов", file=log)
+            test = tournament.sprt()
+            if test is not None and test[3] is not None:
+                break
+    finally:
+        pool.terminate()
+        pool.join()
+    return tournament
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Турнир двух настроек движка (игра сам с собой)")
+    parser.add_argument('--engine1', default='', help="настройки первого (базового) движка, "
+                        "например 'depth=4' или 'time=0.1,lmr=0'")
+    parser.add_argument('--engine2', default='', help="настройки второго (нового) движка")
+    parser.add_argument('--games', type=int, default=20,
+                        help="число партий (округляется до четного: дебют играется за оба цвета)")
+    parser.add_argument('--openings', default=None,
+                        help="файл EPD/FEN с начальными позициями (по умолчанию случайные дебюты)")
+    parser.add_argument('--opening-plies', type=int, default=OPENING_PLIES,
+                        help="число случайных полуходов в дебюте")
+    parser.add_argument('--seed', type=int, default=None, help="зерно для выбора дебютов")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="число процессов")
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES,
+                        help="ничья после стольких полуходов")
+    parser.add_argument('--sprt', nargs=2, type=float, metavar=('ELO0', 'ELO1'), default=None,
+                        help="SPRT для гипотезы, что движок 2 сильнее, с остановкой по решению")
+    parser.add_argument('--json', action='store_true', help="вывести итог в JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        configs = [parse_engine(args.engine1), parse_engine(args.engine2)]
+    except ValueError as error:
+        parser.error(str(error))
+    pairs = (args.games + 1) // 2
+    if args.openings:
+        rng = random.Random(args.seed)
+        try:
+            openings = read_openings(args.openings)
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+        openings = [rng.choice(openings) for _ in range(pairs)] if len(openings) < pairs \
+            else rng.sample(openings, pairs)
+    else:
+        openings = random_openings(pairs, args.opening_plies, args.seed)
+
+    sprt_bounds = None
+    if args.sprt is not None:
+        sprt_bounds = (args.sprt[0], args.sprt[1], SPRT_ALPHA, SPRT_BETA)
+    tournament = run_tournament(configs, openings, args.workers, args.max_plies, sprt_bounds)
+    if args.json:
+        json.dump(tournament.summary(), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print(tournament.format())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
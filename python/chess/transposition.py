@@ -0,0 +1,69 @@
+from array import array
+
+from board import NO_MOVE
+
+# Тип оценки, сохраненной в таблице
+EXACT = 0
+LOWER = 1   # оценка не меньше сохраненной (было отсечение по beta)
+UPPER = 2   # оценка не больше сохраненной (ни один ход не улучшил alpha)
+
+# Байт на одну запись: ключ (8) + оценка (4) + ход (2) + глубина (1) + тип (1) + поколение (1)
+ENTRY_SIZE = 17
+
+
+class TranspositionTable:
+    # Хеш-таблица фиксированного размера в плоских массивах array,
+    # поэтому расход памяти определяется только size_mb. Ходы хранятся
+    # 16-битными кодами (board.encode_move), NO_MOVE - нет хода.
+    # Замена по глубине: запись вытесняется более глубокой (или равной) оценкой,
+    # а записи прошлых поисков вытесняются всегда.
+    def __init__(self, size_mb=16):
+        self.size = max(1, size_mb * 1024 * 1024 // ENTRY_SIZE)
+        self.keys = array('Q', [0]) * self.size
+        self.scores = array('i', [0]) * self.size
+        self.moves = array('H', [NO_MOVE]) * self.size
+        self.depths = array('b', [-1]) * self.size
+        self.flags = array('B', [EXACT]) * self.size
+        self.ages = array('B', [0]) * self.size
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        # Вызывается перед каждым новым поиском (ходом компьютера)
+        self.age = (self.age + 1) & 0xFF
+
+    def clear(self):
+        self.depths = array('b', [-1]) * self.size
+        self.probes = self.hits = self.stores = 0
+
+    def probe(self, key):
+        # Возвращает (глубина, оценка, тип, код хода) или None
+        self.probes += 1
+        index = key % self.size
+        if self.depths[index] < 0 or self.keys[index] != key:
+            return None
+        self.hits += 1
+        return (self.depths[index], self.scores[index],
+                self.flags[index], self.moves[index])
+
+    def store(self, key, depth, score, flag, move):
+        index = key % self.size
+        if (self.depths[index] >= 0 and self.keys[index] != key and
+                self.ages[index] == self.age and self.depths[index] > depth):
+            return
+        self.keys[index] = key
+        self.scores[index] = int(score)
+        self.moves[index] = move
+        self.depths[index] = depth
+        self.flags[index] = flag
+        self.ages[index] = self.age
+        self.stores += 1
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def usage(self):
+        # Доля занятых записей
+        return sum(1 for d in self.depths if d >= 0) / self.size